@@ -0,0 +1,120 @@
+import functools
+import os
+
+import pandas as pd
+
+from data_loader_lux import (artifact_is_stale, file_digest, file_signature, installations_path, load_installations,
+                             power_col, write_artifact)
+from capacity_history_lux import capacity_timeline, history_path
+from entsoe_store_lux import display_tz, has_data, time_bounds
+from query_lux import read_rollup, refresh_rollup, rollup_path
+
+# Daily energy indicators derived from the ENTSO-E store: renewable share of Load, import
+# dependency and capacity factors. Built from the daily rollup (which is updated per partition as
+# new quarter-hours arrive), so a refresh never goes back to the full-resolution history.
+analytics_name = 'analytics_daily.parquet'
+rolling_window = '30D'
+
+# Waste incineration is only partly renewable and Fossil Gas not at all, so both count as non-renewable
+renewable_types = ['Biomass', 'Hydro Run-of-river and poundage', 'Hydro Water Reservoir', 'Solar', 'Wind Onshore']
+
+# ENTSO-E production type -> ILR installation type used for its installed capacity
+capacity_types = {
+    'Solar': 'Installation photovoltaïque',
+    'Wind Onshore': 'Eolienne',
+}
+
+
+def analytics_path(root):
+    return os.path.join(root, analytics_name)
+
+
+def _sources(root, installations=installations_path):
+    return {
+        'rollup': file_digest(rollup_path(root)),
+        'installations': file_digest(installations) if os.path.exists(installations) else None,
+        'history': file_digest(history_path) if os.path.exists(history_path) else None,
+    }
+
+
+# Installed capacity (MW) per ENTSO-E production type: per recorded workbook version if the
+# capacity history exists, otherwise the current ILR workbook as a single version dated today.
+# The workbook has no commissioning dates, so the capacity before the first version is unknown.
+def installed_capacity(installations=installations_path):
+    timeline = capacity_timeline()
+    if not timeline.empty:
+        capacity = pd.DataFrame({col: timeline.get(ilr_type) for col, ilr_type in capacity_types.items()})
+        return capacity.set_axis(pd.DatetimeIndex(capacity.index).tz_localize(display_tz))
+    if not os.path.exists(installations):
+        return pd.Series(float('nan'), index=list(capacity_types))
+    df = load_installations(installations)
+    totals = df.groupby("Type d'installation")[power_col].sum() / 1000
+    today = pd.Timestamp.now(tz=display_tz).normalize()
+    return pd.DataFrame({col: [totals.get(ilr_type, float('nan'))] for col, ilr_type in capacity_types.items()},
+                        index=pd.DatetimeIndex([today]))
+
+
+# capacity: installed MW per production type, either one value per type or a frame indexed by day
+def compute_analytics(daily, capacity, last=None):
+    # Energy per day from the daily mean power (23 or 25 hours on DST changes)
+    hours = ((daily.index + pd.DateOffset(days=1)) - daily.index) / pd.Timedelta(hours=1)
+    energy = daily.mul(hours, axis=0)
+    if last is not None:
+        # Drop the day still being filled (last quarter-hour not stored yet), its mean covers only part of the day
+        cutoff = (last + pd.Timedelta(minutes=15)).tz_convert(daily.index.tz).normalize()
+        daily, energy = daily.loc[daily.index < cutoff], energy.loc[energy.index < cutoff]
+
+    production = energy.drop(columns='Load', errors='ignore').sum(axis=1, min_count=1)
+    renewable = energy.reindex(columns=renewable_types).sum(axis=1, min_count=1)
+    load = energy['Load']
+    table = pd.DataFrame({
+        'Load (MWh)': load,
+        'Production (MWh)': production,
+        'Renewable (MWh)': renewable,
+        'Net import (MWh)': load - production,
+    })
+    table['Renewable share'] = renewable / load
+    table['Import dependency'] = table['Net import (MWh)'] / load
+    window = table[['Load (MWh)', 'Renewable (MWh)', 'Net import (MWh)']].rolling(rolling_window).sum()
+    table['Renewable share (30-day)'] = window['Renewable (MWh)'] / window['Load (MWh)']
+    table['Import dependency (30-day)'] = window['Net import (MWh)'] / window['Load (MWh)']
+
+    if isinstance(capacity, pd.DataFrame):
+        # Each version holds until the next one; days before the first version have no capacity factor
+        capacity = capacity.reindex(capacity.index.union(daily.index)).ffill().reindex(daily.index)
+    for col in capacity_types:
+        installed = capacity[col] if col in capacity else float('nan')
+        table[f'{col} installed (MW)'] = installed
+        table[f'{col} capacity factor'] = daily[col] / installed if col in daily else float('nan')
+    return table.astype('float64')
+
+
+def build_analytics(root, installations=installations_path, capacity=None):
+    refresh_rollup(root)
+    if capacity is None:
+        capacity = installed_capacity(installations)
+    table = compute_analytics(read_rollup(root, 'D'), capacity, last=time_bounds(root)[1])
+    write_artifact(table, analytics_path(root), _sources(root, installations))
+    return table
+
+
+# Recompute the indicators when the rollup or the ILR workbook changed
+def refresh_analytics(root, installations=installations_path):
+    refresh_rollup(root)
+    if not artifact_is_stale(analytics_path(root), _sources(root, installations)):
+        return False
+    build_analytics(root, installations)
+    return True
+
+
+@functools.lru_cache(maxsize=4)
+def _read_analytics(path, signature):
+    return pd.read_parquet(path)
+
+
+def load_analytics(root, start=None, end=None):
+    if not has_data(root):
+        return pd.DataFrame()
+    refresh_analytics(root)
+    path = analytics_path(root)
+    return _read_analytics(path, file_signature(path)).loc[start:end]
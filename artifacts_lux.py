@@ -0,0 +1,127 @@
+import functools
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from data_loader_lux import file_signature
+from entsoe_store_lux import display_tz
+
+# Published dashboard datasets (see build_artifacts_lux.py). Every build goes to its own version
+# directory with a manifest; current.json points at the version the dashboard should read, and is
+# only replaced once the new version is complete.
+# Time series are written as one file per month (<name>/YYYY-MM.parquet). The files of months whose
+# content did not change are byte-identical to the previous version, so git stores them only once and
+# a daily build only adds the months it touched.
+artifacts_dir = r'data/artifacts'
+current_name = 'current.json'
+manifest_name = 'manifest.json'
+keep_versions = 2
+
+
+def version_dir(version, root=artifacts_dir):
+    return os.path.join(root, version)
+
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def current_version(root=artifacts_dir):
+    path = os.path.join(root, current_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('version')
+
+
+@functools.lru_cache(maxsize=4)
+def _read_manifest(path, signature):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Manifest of the published (or the given) version, None if nothing has been published yet
+def load_manifest(version=None, root=artifacts_dir):
+    version = version or current_version(root)
+    if version is None:
+        return None
+    path = os.path.join(version_dir(version, root), manifest_name)
+    if not os.path.exists(path):
+        return None
+    return _read_manifest(path, file_signature(path))
+
+
+def artifact_path(manifest, name, root=artifacts_dir):
+    return os.path.join(version_dir(manifest['version'], root), manifest['artifacts'][name]['file'])
+
+
+# Month of a timestamp in display time; tz-naive timestamps (e.g. the workbook dates) are taken as they are
+def _month_key(ts):
+    ts = pd.Timestamp(ts)
+    return (ts.tz_convert(display_tz) if ts.tz is not None else ts).strftime('%Y-%m')
+
+
+# Write one dataset into a version directory and return its manifest entry
+def write_dataset(frame, out_dir, name):
+    if not isinstance(frame.index, pd.DatetimeIndex) or frame.empty:
+        frame.to_parquet(os.path.join(out_dir, f'{name}.parquet'))
+        return {'file': f'{name}.parquet', 'rows': int(len(frame))}
+    os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+    partitions = {}
+    index = frame.index.tz_convert(display_tz) if frame.index.tz is not None else frame.index
+    for key, part in frame.groupby(index.strftime('%Y-%m')):
+        partitions[key] = f'{name}/{key}.parquet'
+        part.to_parquet(os.path.join(out_dir, partitions[key]))
+    return {'partitions': partitions, 'rows': int(len(frame))}
+
+
+def has_artifact(manifest, name):
+    return manifest is not None and name in manifest['artifacts']
+
+
+@functools.lru_cache(maxsize=32)
+def _read_artifact(path, signature):
+    return pd.read_parquet(path)
+
+
+def _read_file(manifest, file, root):
+    path = os.path.join(version_dir(manifest['version'], root), file)
+    return _read_artifact(path, file_signature(path))
+
+
+# Whole dataset, or for time series only the rows between start and end (inclusive), reading just
+# the monthly files that overlap them
+def read_artifact(manifest, name, root=artifacts_dir, start=None, end=None):
+    entry = manifest['artifacts'][name]
+    if 'partitions' not in entry:
+        frame = _read_file(manifest, entry['file'], root)
+        if start is not None or end is not None:
+            frame = frame.loc[start:end]
+        return frame.copy(deep=False)
+    keys = [key for key in sorted(entry['partitions'])
+            if (start is None or key >= _month_key(start)) and (end is None or key <= _month_key(end))]
+    if not keys:
+        # Keep the columns and index type of the dataset
+        return _read_file(manifest, entry['partitions'][min(entry['partitions'])], root).iloc[:0].copy()
+    frame = pd.concat([_read_file(manifest, entry['partitions'][key], root) for key in keys])
+    return frame.loc[start:end] if start is not None or end is not None else frame
+
+
+# Write the manifest of a complete version directory, point current.json at it and drop older versions
+def publish(manifest, root=artifacts_dir, keep=keep_versions):
+    _write_json(os.path.join(version_dir(manifest['version'], root), manifest_name), manifest)
+    _write_json(os.path.join(root, current_name), {'version': manifest['version'], 'built': manifest['built']})
+    versions = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name, manifest_name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                versions.append((json.load(f)['built'], name))
+    for _, name in sorted(versions)[:-keep]:
+        if name != manifest['version']:
+            shutil.rmtree(version_dir(name, root), ignore_errors=True)
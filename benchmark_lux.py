@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import artifacts_lux
+import capacity_cube_lux
+import communities_pdf_lux
+import data_loader_lux
+import downsample_lux
+import entsoe_store_lux
+import geocode_lux
+import query_lux
+from entsoe_backfill_lux import production_types
+
+try:
+    # Imported here so the first figure stage does not time the plotly import
+    import plotly.graph_objects as go
+except ImportError:
+    go = None
+
+# Benchmarks for the data pipeline and the dashboard load path on synthetic data.
+# Every stage runs with cold in-process caches and reports wall time and peak traced memory.
+#
+#   python benchmark_lux.py --years 1 5 10 --json bench.json
+#   python benchmark_lux.py --baseline bench.json   # exit code 1 if a stage got slower
+
+prod_cols = ['Load', 'Hydro Run-of-river and poundage', 'Wind Onshore', 'Solar', "Biomass", 'Fossil Gas', 'Waste']
+installation_types = {
+    'Installation photovoltaïque': 0.99,
+    'Cogénération': 0.003,
+    'Eolienne': 0.002,
+    'Installation hydroélectrique': 0.002,
+    'Centrale à Biogaz': 0.002,
+    'Biomasse solide': 0.001,
+}
+
+
+def synthetic_production(years, end=pd.Timestamp('2025-01-01', tz='Europe/Brussels'), seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end - pd.DateOffset(years=years), end, freq='15min', inclusive='left')
+    hours = index.hour.to_numpy() + index.minute.to_numpy() / 60
+    df = pd.DataFrame(rng.gamma(2.0, 5.0, size=(len(index), len(production_types))), index=index, columns=production_types)
+    df['Solar'] = np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 150 * rng.random(len(index))
+    df['Hydro Water Reservoir'] = np.nan
+    df['Load'] = 550 + 150 * np.sin((hours - 3) / 24 * 2 * np.pi) + rng.normal(0, 20, len(index))
+    return df
+
+
+# Same layout as the CSV written by the original daily_data_lux.py (second header row, mixed offsets)
+def write_legacy_csv(df, path):
+    df.to_csv(path)
+    with open(path, encoding='utf-8') as f:
+        header = f.readline()
+        rest = f.read()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        f.write(',' + ','.join(['Actual Aggregated'] * len(df.columns)) + '\n')
+        f.write(rest)
+
+
+def synthetic_communes(n=100):
+    return [f'Commune {i:03d}' for i in range(n)] + ['Esch-sur-Alzette', 'Käerjeng', 'Mondorf-les-Bains']
+
+
+def synthetic_installations(rows, path, seed=0):
+    rng = np.random.default_rng(seed)
+    communes = synthetic_communes()
+    types = list(installation_types)
+    p = np.array(list(installation_types.values()))
+    df = pd.DataFrame({
+        'LAU1': rng.integers(1, 13, rows),
+        'Canton': 'Canton',
+        'LAU2': rng.integers(1, 103, rows),
+        'Commune': rng.choice(communes, rows),
+        "Type d'installation": rng.choice(types, rows, p=p / p.sum()),
+        'Puissance installée (kW)': np.round(rng.lognormal(2.3, 1.0, rows), 2),
+    })
+    df.to_excel(path, index=False)
+
+
+def synthetic_addresses(rows, path, seed=0):
+    rng = np.random.default_rng(seed)
+    communes = synthetic_communes()
+    postcodes = {c: f'L-{1000 + 37 * i}' for i, c in enumerate(communes)}
+    commune = rng.choice(communes, rows)
+    df = pd.DataFrame({
+        'commune': commune,
+        'code_postal': [postcodes[c] for c in commune],
+        'lat_wgs84': 49.45 + rng.random(rows) * 0.6,
+        'lon_wgs84': 5.75 + rng.random(rows) * 0.7,
+        'rue': 'Rue',
+        'numero': rng.integers(1, 200, rows),
+    })
+    df.to_csv(path, sep=';', index=False)
+
+
+def reset_caches():
+    for func in [data_loader_lux._load, entsoe_store_lux._read_partition_cached, artifacts_lux._read_manifest,
+                 artifacts_lux._read_artifact,
+                 downsample_lux._tier, capacity_cube_lux._read_cube, geocode_lux._read_index,
+                 communities_pdf_lux._read_communities, query_lux._history, query_lux._rollup]:
+        func.cache_clear()
+    data_loader_lux._digests.clear()
+    shutil.rmtree(data_loader_lux.cache_dir, ignore_errors=True)
+
+
+# Time func with cold caches, then run it again under tracemalloc for its peak memory
+# (tracing slows pandas code down considerably, so it is kept out of the timed run)
+def measure(results, stage, func, labels, trace_memory=True):
+    reset_caches()
+    start = time.perf_counter()
+    value = func()
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if trace_memory:
+        reset_caches()
+        tracemalloc.start()
+        func()
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    rows = len(value) if isinstance(value, pd.DataFrame) else None
+    results.append(dict(labels, stage=stage, seconds=round(elapsed, 4), peak_mb=peak_mb, rows=rows))
+    print(f"{stage:<32} {' '.join(f'{k}={v}' for k, v in labels.items()):<12} {elapsed:9.3f} s"
+          + (f" {peak_mb:9.1f} MB" if peak_mb is not None else '')
+          + (f" {rows:>9} rows" if rows is not None else ''))
+    return value
+
+
+# The full-file read/concat/dedup/rewrite cycle of the original daily update
+def legacy_csv_merge(csv_path, update):
+    existing = data_loader_lux._parse_production(csv_path)
+    mask = ~((existing.index >= update.index.min()) & (existing.index <= update.index.max()))
+    updated = pd.concat([existing.loc[mask], update])
+    updated = updated[~updated.index.duplicated(keep='last')].sort_index()
+    updated.to_csv(csv_path)
+    return updated
+
+
+def rebuild_rollup(root):
+    path = query_lux.rollup_path(root)
+    for stale in [path, os.path.splitext(path)[0] + '.json']:
+        if os.path.exists(stale):
+            os.remove(stale)
+    return query_lux.refresh_rollup(root)
+
+
+# Publish the coarser tiers of the store the way build_artifacts_lux.py does, for the dashboard read stages
+def publish_tiers(root, version):
+    out_dir = artifacts_lux.version_dir(version)
+    os.makedirs(out_dir, exist_ok=True)
+    artifacts = {}
+    for rule, _, _ in downsample_lux.resolutions[1:]:
+        name = f'production_{rule}'
+        artifacts[name] = artifacts_lux.write_dataset(downsample_lux.read_resolution(root, rule), out_dir, name)
+    artifacts_lux.publish({'version': version, 'built': pd.Timestamp.now(tz='UTC').isoformat(), 'artifacts': artifacts})
+
+
+def build_figure(df):
+    fig = go.Figure()
+    for col in prod_cols:
+        fig.add_trace(go.Scatter(x=df.index, y=df[col], mode='lines', name=col,
+                                 stackgroup=None if col == 'Load' else 'one'))
+    return fig.to_json()
+
+
+def run_production(results, years, trace_memory=True):
+    labels = {'years': years}
+    df = synthetic_production(years)
+    csv_path = os.path.join('data', 'entsoe_lux.csv')
+    write_legacy_csv(df, csv_path)
+    root = entsoe_store_lux.store_path(f'BENCH{years}')
+    entsoe_store_lux.write(df, root)
+    last = df.index.max()
+    update = df.loc[last - pd.Timedelta(days=5):]
+
+    measure(results, 'load: legacy csv', lambda: data_loader_lux._parse_production(csv_path), labels, trace_memory)
+    measure(results, 'load: store (full history)', lambda: entsoe_store_lux.read_range(root, columns=prod_cols), labels, trace_memory)
+    week = measure(results, 'filter: store last 7 days',
+                   lambda: entsoe_store_lux.read_range(root, last - pd.Timedelta(days=7), last, columns=prod_cols), labels, trace_memory)
+    measure(results, 'filter: query last 7 days',
+            lambda: query_lux.query_range(root, last - pd.Timedelta(days=7), last, columns=prod_cols), labels, trace_memory)
+    measure(results, 'aggregate: daily rollup', lambda: rebuild_rollup(root), labels, trace_memory)
+    rule, _ = downsample_lux.choose_resolution(df.index.max() - df.index.min())
+    full = measure(results, f'filter: full range ({rule})',
+                   lambda: downsample_lux.read_resolution(root, rule, columns=prod_cols), labels, trace_memory)
+
+    publish_tiers(root, f'bench{years}')
+    measure(results, 'load: artifact manifest', artifacts_lux.load_manifest, labels, trace_memory)
+    measure(results, f'filter: artifact full range ({rule})',
+            lambda: artifacts_lux.read_artifact(artifacts_lux.load_manifest(), f'production_{rule}'), labels, trace_memory)
+    rule_90, _ = downsample_lux.choose_resolution(pd.Timedelta(days=90))
+    measure(results, f'filter: artifact last 90 days ({rule_90})',
+            lambda: artifacts_lux.read_artifact(artifacts_lux.load_manifest(), f'production_{rule_90}',
+                                                start=last - pd.Timedelta(days=90), end=last), labels, trace_memory)
+
+    if go is not None:
+        # plotly loads its validators on the first figure, keep that out of the timed stages
+        build_figure(week.iloc[:1])
+        measure(results, 'figure: 7 days', lambda: build_figure(week), labels, trace_memory)
+        measure(results, 'figure: full range', lambda: build_figure(full), labels, trace_memory)
+    else:
+        print('plotly is not installed, skipping figure stages')
+    measure(results, 'update: legacy csv merge', lambda: legacy_csv_merge(csv_path, update), labels, trace_memory)
+    measure(results, 'update: store write', lambda: entsoe_store_lux.write(update, root), labels, trace_memory)
+
+
+def run_installations(results, installation_rows, address_rows, trace_memory=True):
+    labels = {'size': installation_rows}
+    synthetic_installations(installation_rows, data_loader_lux.installations_path)
+    synthetic_addresses(address_rows, data_loader_lux.addresses_path)
+    measure(results, 'load: installations workbook', data_loader_lux.load_installations, labels, trace_memory)
+    measure(results, 'load: addresses', data_loader_lux.load_addresses, {'size': address_rows}, trace_memory)
+    measure(results, 'aggregate: geocode index', geocode_lux.build_index, {'size': address_rows}, trace_memory)
+    measure(results, 'aggregate: capacity cube', capacity_cube_lux.build_cube, labels, trace_memory)
+
+
+# Stages that got slower than the baseline by more than the given factor
+def regressions(results, baseline, tolerance):
+    key = lambda r: (r['stage'], r.get('years'), r.get('size'))
+    reference = {key(r): r for r in baseline}
+    slower = []
+    for r in results:
+        ref = reference.get(key(r))
+        if ref and ref['seconds'] > 0.01 and r['seconds'] > ref['seconds'] * tolerance:
+            slower.append((r, ref))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the stroumauer data pipeline on synthetic data.')
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 5, 10], help='Years of 15-min ENTSO-E data')
+    parser.add_argument('--installations', type=int, default=30000, help='Rows in the synthetic ILR workbook')
+    parser.add_argument('--addresses', type=int, default=200000, help='Rows in the synthetic addresses.csv')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare with the results in this JSON file')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass (faster)')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='Allowed slowdown factor against the baseline')
+    args = parser.parse_args(argv)
+
+    results = []
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='stroumauer-bench-')
+    try:
+        os.chdir(workdir)
+        os.makedirs('data')
+        for years in args.years:
+            run_production(results, years, not args.no_memory)
+        run_installations(results, args.installations, args.addresses, not args.no_memory)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for r, ref in slower:
+            print(f"Regression: {r['stage']} ({r.get('years') or r.get('size')}) "
+                  f"{ref['seconds']:.3f} s -> {r['seconds']:.3f} s")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
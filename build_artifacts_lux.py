@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from analytics_lux import load_analytics
+from artifacts_lux import (artifact_path, artifacts_dir, current_version, has_artifact, load_manifest, publish,
+                           version_dir, write_dataset)
+from capacity_cube_lux import load_cube
+from capacity_history_lux import capacity_timeline, history_path
+from communities_pdf_lux import communities_path, load_communities
+from data_loader_lux import addresses_path, artifact_sources, file_digest, installations_path
+from downsample_lux import read_resolution, resolutions
+from entsoe_store_lux import ensure_store, has_data, store_path, time_bounds
+from geocode_lux import index_path, load_index, lookup_postcodes
+from instrument_lux import span
+from pv_sizes_lux import load_bins, load_points
+from query_lux import read_rollup, refresh_rollup, rollup_path
+from zones_lux import configured_zones, csv_path, flows_path, main_zone, net_imports
+
+# Builds every dataset the dashboard shows into a new version of data/artifacts and publishes it.
+# Run after daily_data_lux.py / first_of_month_data_lux.py:
+#
+#   python build_artifacts_lux.py            # no-op if the inputs did not change
+#   python build_artifacts_lux.py --force
+#
+# The version is a hash of the input digests, so unchanged inputs map to the published version.
+format_version = 3
+
+
+def _digest(path):
+    return file_digest(path) if os.path.exists(path) else None
+
+
+# Stores of the main zone, the other configured zones and the cross-border flows
+def store_roots(country_code=main_zone):
+    roots = {country_code: store_path(country_code)}
+    roots.update({zone: store_path(zone) for zone in configured_zones() if zone != country_code})
+    roots['flows'] = flows_path(country_code)
+    return roots
+
+
+def _store_digest(root):
+    if not has_data(root):
+        return None
+    refresh_rollup(root)
+    # Per-partition content digests of the store, as recorded by the daily rollup
+    return hashlib.sha256(json.dumps(artifact_sources(rollup_path(root)), sort_keys=True).encode()).hexdigest()
+
+
+def source_digests(roots):
+    return {
+        'installations': _digest(installations_path),
+        'addresses': _digest(addresses_path),
+        'communities': _digest(communities_path),
+        'capacity_history': _digest(history_path),
+        'stores': {name: _store_digest(root) for name, root in roots.items()},
+    }
+
+
+def version_of(sources):
+    payload = json.dumps({'format': format_version, 'sources': sources}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+# Cumulative number of energy communities per month, every month between the first and last date
+def cumulative_cooperatives(communities):
+    dates = communities['Date'].dropna() if 'Date' in communities else pd.Series(dtype='datetime64[ns]')
+    if dates.empty:
+        return pd.DataFrame({'Month': pd.Series(dtype=str), 'Cooperatives': pd.Series(dtype=int)})
+    cumulative = dates.dt.strftime('%Y-%m').value_counts().sort_index().cumsum()
+    all_months = pd.date_range(start=cumulative.index[0], end=cumulative.index[-1], freq='MS').strftime('%Y-%m')
+    cumulative = cumulative.reindex(all_months, method='ffill').fillna(0).astype(int)
+    return pd.DataFrame({'Month': cumulative.index, 'Cooperatives': cumulative.to_numpy()})
+
+
+def geocode_index():
+    load_index()
+    return pd.read_parquet(index_path)
+
+
+def geocoded_communities():
+    communities = load_communities()
+    communities = communities.dropna(subset=['Postcode']).reset_index(drop=True)
+    return pd.concat([communities, lookup_postcodes(communities['Postcode'])], axis=1)
+
+
+def _datasets(roots, country_code=main_zone):
+    store_root = roots[country_code]
+    datasets = {
+        'geocode_index': geocode_index,
+        'capacity_cube': load_cube,
+        'capacity_timeline': capacity_timeline,
+        'communities': geocoded_communities,
+        'cooperatives': lambda: cumulative_cooperatives(load_communities()),
+        'pv_points': load_points,
+        'pv_size_bins': load_bins,
+    }
+    if has_data(store_root):
+        # The quarter-hourly data stays in the store, coarser tiers are published as whole-history tables
+        for rule, _, _ in resolutions[1:]:
+            datasets[f'production_{rule}'] = lambda rule=rule: read_resolution(store_root, rule)
+        datasets['analytics'] = lambda: load_analytics(store_root)
+    # Daily means of the neighbouring zones and the net imports per neighbour, for the comparison charts
+    for zone, root in roots.items():
+        if zone not in (country_code, 'flows') and has_data(root):
+            datasets[f'production_D_{zone}'] = lambda root=root: read_rollup(root, 'D')
+    if has_data(roots['flows']):
+        datasets['net_imports_D'] = lambda: net_imports(read_rollup(roots['flows'], 'D'), country_code)
+    return datasets
+
+
+# Without addresses.csv the geocoding index of the published version is reused
+def _restore_geocode_index(root):
+    manifest = load_manifest(root=root)
+    if os.path.exists(addresses_path) or os.path.exists(index_path) or not has_artifact(manifest, 'geocode_index'):
+        return
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    shutil.copyfile(artifact_path(manifest, 'geocode_index', root), index_path)
+
+
+# Builds started from several dashboard sessions at once (fresh checkout) run one after the other
+_build_lock = threading.Lock()
+
+
+def build_artifacts(root=artifacts_dir, country_code='LU', force=False):
+    with _build_lock:
+        return _build_artifacts(root, country_code, force)
+
+
+def _build_artifacts(root, country_code, force):
+    roots = store_roots(country_code)
+    store_root = roots[country_code]
+    ensure_store(store_root, csv_path)
+    sources = source_digests(roots)
+    version = version_of(sources)
+    # current.json can point at a version directory that is missing or incomplete; build it again then
+    if not force and current_version(root) == version and load_manifest(root=root) is not None:
+        print(f"Dashboard artifacts are up to date (version {version})")
+        return None
+
+    _restore_geocode_index(root)
+    out_dir = version_dir(version, root)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir, exist_ok=True)
+    artifacts = {}
+    for name, build in _datasets(roots, country_code).items():
+        with span(f'artifact {name}') as s:
+            try:
+                frame = build()
+            except (OSError, ImportError, ValueError) as e:
+                # e.g. no addresses.csv and no earlier geocoding index; the dashboard skips that section
+                print(f"Skipping {name}: {e}")
+                continue
+            artifacts[name] = write_dataset(frame, out_dir, name)
+            s['rows'] = len(frame)
+
+    first, last = time_bounds(store_root)
+    manifest = {
+        'version': version,
+        'format': format_version,
+        'built': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sources': sources,
+        'zones': [zone for zone, root in roots.items() if zone != 'flows' and has_data(root)],
+        'store': {
+            'root': store_root,
+            'first': first.isoformat() if first is not None else None,
+            'last': last.isoformat() if last is not None else None,
+        },
+        'artifacts': artifacts,
+    }
+    publish(manifest, root)
+    print(f"Published dashboard artifacts version {version} ({len(artifacts)} datasets) in {out_dir}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the datasets shown by the stroumauer dashboard.')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the inputs did not change')
+    parser.add_argument('--output', default=artifacts_dir, help='Artifact directory')
+    args = parser.parse_args(argv)
+    build_artifacts(args.output, force=args.force)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import functools
+import os
+
+import pandas as pd
+
+from data_loader_lux import (addresses_path, artifact_is_stale, cache_dir, file_digest, file_signature,
+                             installations_path, load_installations, power_col, write_artifact)
+from geocode_lux import lookup_communes
+
+# Installed capacity per commune and technology, with commune centroids already joined.
+# Rebuilt from the ILR workbook and the address registry whenever either of them changes.
+cube_path = os.path.join(cache_dir, 'capacity_cube.parquet')
+commune_col = 'Commune'
+type_col = "Type d'installation"
+
+
+def normalize_text(series):
+    return series.astype(str).str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
+
+
+def _sources(installations=installations_path):
+    addresses = file_digest(addresses_path) if os.path.exists(addresses_path) else None
+    return {'installations': file_digest(installations), 'addresses': addresses}
+
+
+def is_stale(path=cube_path, installations=installations_path):
+    return artifact_is_stale(path, _sources(installations))
+
+
+def build_cube(path=cube_path, installations=installations_path):
+    df = load_installations(installations)
+    if commune_col not in df.columns or power_col not in df.columns:
+        raise ValueError(f"Could not find columns '{commune_col}' and/or '{power_col}' in the data.")
+
+    # All hydro plant types are shown as a single 'Hydro' technology
+    df = df.assign(**{type_col: df[type_col].mask(df[type_col].str.contains('Hydro', case=False, na=False), 'Hydro')})
+    cube = df.groupby([commune_col, type_col], as_index=False).agg(
+        **{power_col: (power_col, 'sum'), 'Installations': (power_col, 'size')})
+
+    # Commune centroids from the geocoding index (accent-insensitive match)
+    cube = pd.concat([cube, lookup_communes(cube[commune_col])], axis=1)
+    cube = cube.dropna(subset=['Latitude', 'Longitude'])
+
+    # Plain ASCII commune names for display, the technology labels are kept as-is for colour mapping
+    cube[commune_col] = normalize_text(cube[commune_col])
+    cube = cube.reset_index(drop=True)
+
+    write_artifact(cube, path, _sources(installations))
+    return cube
+
+
+@functools.lru_cache(maxsize=4)
+def _read_cube(path, signature):
+    return pd.read_parquet(path)
+
+
+# Cube for the dashboard, rebuilt first if the workbook or the addresses changed
+def load_cube(path=cube_path):
+    if is_stale(path):
+        build_cube(path)
+    return _read_cube(path, file_signature(path)).copy(deep=False)
+
+
+if __name__ == '__main__':
+    cube = build_cube()
+    print(f"Capacity cube with {len(cube)} commune/technology rows written to {cube_path}")
@@ -0,0 +1,85 @@
+import functools
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from data_loader_lux import (artifact_sources, file_digest, file_signature, installations_path, load_installations,
+                             power_col, write_sources)
+
+# History of the ILR installations workbook, which is overwritten in place by every download.
+# Each new workbook version appends only the commune/technology rows whose installed power or
+# installation count changed since the previous version, so the capacity at any date is the sum
+# of all deltas recorded up to that date.
+history_path = r'data/ilr-capacity-history.csv'
+commune_col = 'Commune'
+type_col = "Type d'installation"
+date_col = 'Date'
+delta_power_col = 'Delta power (kW)'
+delta_count_col = 'Delta installations'
+history_columns = [date_col, commune_col, type_col, delta_power_col, delta_count_col]
+
+
+@functools.lru_cache(maxsize=4)
+def _read_history(path, signature):
+    history = pd.read_csv(path, parse_dates=[date_col])
+    return history.sort_values(date_col, kind='stable', ignore_index=True)
+
+
+def load_history(path=history_path):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=history_columns)
+    return _read_history(path, file_signature(path)).copy(deep=False)
+
+
+# Installed power (kW) and installation count per commune and technology at the end of the given date
+def capacity_at(date=None, path=history_path):
+    history = load_history(path)
+    if date is not None:
+        history = history[history[date_col] <= pd.Timestamp(date)]
+    capacity = history.groupby([commune_col, type_col])[[delta_power_col, delta_count_col]].sum()
+    capacity.columns = [power_col, 'Installations']
+    return capacity[(capacity[power_col].round(3) != 0) | (capacity['Installations'] != 0)].reset_index()
+
+
+# Installed power (MW) per technology (columns) at every recorded date (rows)
+def capacity_timeline(path=history_path):
+    history = load_history(path)
+    by_date = history.groupby([date_col, type_col])[delta_power_col].sum().unstack(fill_value=0)
+    return by_date.cumsum() / 1000
+
+
+def _snapshot(installations):
+    df = load_installations(installations)
+    snapshot = df.groupby([commune_col, type_col])[power_col].agg(['sum', 'size'])
+    snapshot.columns = [power_col, 'Installations']
+    return snapshot
+
+
+# Append the changes of the current workbook to the history, unless this version is already recorded
+def record_snapshot(installations=installations_path, path=history_path, date=None):
+    sources = {'installations': file_digest(installations)}
+    if os.path.exists(path) and artifact_sources(path) == sources:
+        return None
+    previous = capacity_at(path=path).set_index([commune_col, type_col])
+    current = _snapshot(installations)
+    delta = current.sub(previous, fill_value=0).fillna(0)
+    delta = delta[(delta[power_col].round(3) != 0) | (delta['Installations'] != 0)].reset_index()
+    delta.insert(0, date_col, pd.Timestamp(date or datetime.now(timezone.utc).date()).strftime('%Y-%m-%d'))
+    delta = delta.rename(columns={power_col: delta_power_col, 'Installations': delta_count_col})
+    delta[delta_power_col] = delta[delta_power_col].round(3)
+    delta[delta_count_col] = delta[delta_count_col].astype(int)
+
+    exists = os.path.exists(path)
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        delta[history_columns].to_csv(f, header=not exists, index=False)
+    write_sources(path, sources)
+    return delta
+
+
+if __name__ == '__main__':
+    recorded = record_snapshot()
+    if recorded is None:
+        print(f"The current workbook is already recorded in {history_path}")
+    else:
+        print(f"Recorded {len(recorded)} commune/technology changes in {history_path}")
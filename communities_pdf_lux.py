@@ -0,0 +1,209 @@
+import functools
+import hashlib
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+
+from data_loader_lux import (artifact_is_stale, cache_dir, file_digest, file_signature, pdf_path,
+                             write_artifact)
+
+# Parser for the ILR "Liste des communautés énergétiques" PDF. Rows are read page by page and
+# the parsed list is stored as CSV next to the PDF, so the dashboard never has to parse it.
+communities_path = r'data/ilr-communautes-energetiques.csv'
+page_cache_dir = os.path.join(cache_dir, 'pdf_pages')
+
+Community = namedtuple('Community', ['name', 'raison_sociale', 'siege_social', 'postcode', 'date'])
+columns = {
+    'name': 'Community',
+    'raison_sociale': 'Raison sociale',
+    'siege_social': 'Siège social',
+    'postcode': 'Postcode',
+    'date': 'Date',
+}
+
+date_re = re.compile(r'(\d{2}/\d{2}/\d{4}|\d{2}\.\d{2}\.\d{4}|\d{4}-\d{2}-\d{2})')
+date_formats = ('%d/%m/%Y', '%d.%m.%Y', '%Y-%m-%d')
+postcode_re = re.compile(r'L-\s?(\d{4})\b')
+page_header_re = re.compile(r'^\s*Page \d+ de \d+\s*$', re.MULTILINE)
+table_header = 'Date de la dernière notification'
+
+# Legal forms found in the "Raison sociale" column, longest variants first
+legal_forms = [
+    'association sans but lucratif',
+    'societe cooperative',
+    'societe civile immobiliere',
+    'societe civile',
+    'societe anonyme',
+    'societe a responsabilite limitee simplifiee',
+    'societe a responsabilite limitee',
+    'societe en commandite par actions',
+    'societe en commandite simple',
+    'syndicat de coproprietaires',
+    'syndicat intercommunal',
+    'administration communale',
+    'etablissement public',
+    'fondation',
+]
+
+
+# The PDF text has stray spaces inside words ("coop érative"), so allow a space after every letter
+def _loose(phrase):
+    return r'\s+'.join(r'\s?'.join(re.escape(c) for c in word) for word in phrase.split())
+
+
+legal_form_re = re.compile('|'.join(_loose(f) for f in legal_forms))
+
+
+# Lowercase ASCII version of the text with the same length, for position-preserving matching
+def _fold(text):
+    folded = []
+    for c in text:
+        base = unicodedata.normalize('NFKD', c)[:1]
+        folded.append(base.lower() if base.isascii() and len(base.lower()) == 1 else c)
+    return ''.join(folded)
+
+
+def _clean(text):
+    text = re.sub(r'\s+', ' ', text).strip(' ,')
+    text = re.sub(r'L- (?=\d{4})', 'L-', text)
+    return re.sub(r' -(?=\w)', '-', text)
+
+
+# Raw content stream(s) of a page, used as the key of its cached text
+def _page_content(page):
+    contents = page.get_contents()
+    if contents is None:
+        return b''
+    if isinstance(contents, list):
+        return b''.join(stream.get_object().get_data() for stream in contents)
+    return contents.get_data()
+
+
+def _page_text(page):
+    key = hashlib.sha256(_page_content(page)).hexdigest()
+    path = os.path.join(page_cache_dir, f'{key}.txt')
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    text = page.extract_text() or ''
+    os.makedirs(page_cache_dir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return text
+
+
+def _parse_date(value):
+    for fmt in date_formats:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+# Split the text of one table row (everything before its notification date) into its columns
+def _parse_row(text, date):
+    postcode = postcode_re.search(text)
+    head = text[:postcode.start()] if postcode else text
+    matches = list(legal_form_re.finditer(_fold(head)))
+    if matches:
+        # The last match is the legal form; names can contain the same words ("Administration communale de ...")
+        form = matches[-1]
+        name, raison, street = head[:form.start()], head[form.start():form.end()], head[form.end():]
+    else:
+        fields = [f for f in re.split(r'\s{2,}|\n', head) if f.strip()]
+        name, raison, street = (fields[0] if fields else ''), '', ' '.join(fields[1:])
+    siege = _clean(street)
+    if postcode:
+        siege = _clean(f"{siege}, {text[postcode.start():]}")
+    return Community(
+        name=_clean(name),
+        raison_sociale=_clean(raison),
+        siege_social=siege,
+        postcode=postcode.group(1) if postcode else None,
+        date=_parse_date(date),
+    )
+
+
+def _with_postcode_line(record, line):
+    postcode = postcode_re.search(line)
+    return record._replace(siege_social=_clean(f"{record.siege_social}, {line}"), postcode=postcode.group(1))
+
+
+# Yield one Community per table row, reading the PDF one page at a time. A row whose
+# "L-xxxx Locality" line was pushed past its date (or onto the next page) is completed
+# from the start of the following text before it is yielded.
+def iter_communities(path=pdf_path):
+    import PyPDF2
+    reader = PyPDF2.PdfReader(path)
+    buffer = ''
+    pending = None
+    for page in reader.pages:
+        text = page_header_re.sub('', _page_text(page))
+        if table_header in text:
+            text = text.split(table_header, 1)[1]
+        buffer += text + '\n'
+        while True:
+            match = date_re.search(buffer)
+            if not match:
+                break
+            chunk, buffer = buffer[:match.start()], buffer[match.end():]
+            if pending is not None:
+                first_line = chunk.lstrip().split('\n', 1)
+                if postcode_re.match(first_line[0].strip()):
+                    pending = _with_postcode_line(pending, first_line[0])
+                    chunk = first_line[1] if len(first_line) > 1 else ''
+                yield pending
+                pending = None
+            record = _parse_row(chunk, match.group(1))
+            if record.postcode is None:
+                pending = record
+            else:
+                yield record
+    if pending is not None:
+        first_line = buffer.lstrip().split('\n', 1)[0].strip()
+        yield _with_postcode_line(pending, first_line) if postcode_re.match(first_line) else pending
+
+
+def parse_communities(path=pdf_path):
+    records = pd.DataFrame(list(iter_communities(path)), columns=Community._fields)
+    records['date'] = pd.to_datetime(records['date'])
+    return records.rename(columns=columns)
+
+
+def _sources(path=pdf_path):
+    return {'pdf': file_digest(path)}
+
+
+def is_stale(output=communities_path, path=pdf_path):
+    return artifact_is_stale(output, _sources(path))
+
+
+# Parse the PDF and store the list, unless it is already up to date
+def refresh_communities(output=communities_path, path=pdf_path, force=False):
+    if not force and not is_stale(output, path):
+        return False
+    write_artifact(parse_communities(path), output, _sources(path))
+    return True
+
+
+@functools.lru_cache(maxsize=4)
+def _read_communities(output, signature):
+    return pd.read_csv(output, dtype={'Postcode': str}, parse_dates=['Date'])
+
+
+def load_communities(output=communities_path, path=pdf_path):
+    if os.path.exists(path):
+        refresh_communities(output, path)
+    return _read_communities(output, file_signature(output)).copy(deep=False)
+
+
+if __name__ == '__main__':
+    refresh_communities(force=True)
+    print(f"Parsed energy communities written to {communities_path}")
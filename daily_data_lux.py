@@ -1,67 +1,40 @@
-import pandas as pd
 from entsoe import EntsoePandasClient
-from datetime import datetime, timedelta
 import os
-import requests
-from bs4 import BeautifulSoup
 
-csv_path = 'data/entsoe_lux.csv'
+from analytics_lux import analytics_path, refresh_analytics
+from capacity_cube_lux import build_cube, cube_path, is_stale
+from capacity_history_lux import history_path, record_snapshot
+from data_loader_lux import addresses_path
+from download_lux import absolute_url, download, get_soup
+from entsoe_store_lux import store_path
+from instrument_lux import span
+from validate_lux import pending_gaps
+from zones_lux import configured_zones, main_zone, update_all
 
 # User must set their ENTSO-E API key as an environment variable or directly here
 API_KEY = os.environ.get("ENTSOE_API_KEY")
 if not API_KEY:
     raise ValueError("ENTSOE_API_KEY environment variable not set.")
 client = EntsoePandasClient(api_key=API_KEY)
-country_code = 'LU'
+country_code = main_zone
+store_root = store_path(country_code)
 
-# List of desired production types
-production_types = [
-    'Hydro Run-of-river and poundage',
-    'Biomass',
-    'Fossil Gas',
-    'Hydro Water Reservoir',
-    'Waste',
-    'Wind Onshore',
-    'Solar'
-]
-
-# Determine start and end dates for update
-if os.path.exists(csv_path):
-    existing = pd.read_csv(csv_path, header=0, skiprows=[1], index_col=0)
-    existing.index = pd.to_datetime(existing.index)
-    last_date = existing.index.max()
-    # Download from 5 days before last_date to today
-    start = last_date - pd.Timedelta(days=5)
-    end = pd.Timestamp(datetime.utcnow(), tz=last_date.tz if last_date.tz else 'Europe/Brussels')
-else:
-    # If no file, download from 2020-01-01
-    start = pd.Timestamp('2020-01-01T00:00', tz='Europe/Brussels')
-    end = pd.Timestamp(datetime.utcnow(), tz='Europe/Brussels')
-    existing = None
-
-# Download actual generation per type (quarter-hourly)
-gen = client.query_generation(country_code, start=start, end=end, psr_type=None)
-gen_selected = gen[production_types]
-# Download load data (quarter-hourly)
-load = client.query_load(country_code, start=start, end=end)
-# Combine into one DataFrame
-result = gen_selected.copy()
-result['Load'] = load
-
-# Merge/append to existing data
-if existing is not None:
-    # Remove overlapping dates in existing for the update range
-    mask = ~((existing.index >= result.index.min()) & (existing.index <= result.index.max()))
-    existing = existing.loc[mask]
-    # Append new data and sort
-    updated = pd.concat([existing, result])
-    updated = updated[~updated.index.duplicated(keep='last')].sort_index()
-else:
-    updated = result
-
-# Save to CSV
-updated.to_csv(csv_path)
-print('ENTSO-E data updated and saved to entsoe_lux.csv')
+# All configured zones (and the cross-border flows of Luxembourg) are updated concurrently:
+# empty stores are backfilled month by month, then the last 5 days are downloaded again and only the
+# monthly partitions they cover are rewritten. Missing intervals found by the validation of the last
+# run (data/entsoe/<zone>/gaps.json) are fetched again (see zones_lux.py and validate_lux.py)
+with span('update zones'):
+    updated, failed = update_all(client)
+for name, touched in sorted(updated.items()):
+    print(f"ENTSO-E data updated for {name} (partitions rewritten: {', '.join(touched)})")
+for zone in sorted(configured_zones()):
+    gaps = pending_gaps(store_path(zone))
+    if gaps:
+        print(f"{zone}: {len(gaps)} interval(s) still missing, first from {gaps[0]['start']} to {gaps[0]['end']}")
+for name, e in sorted(failed.items()):
+    print(f"Failed to update {name}: {e}")
+if country_code in failed:
+    raise failed[country_code]
 
 
 # Download the latest ILR energy installations Excel file from data.public.lu
@@ -69,23 +42,38 @@ public_lu_url = "https://data.public.lu/fr/datasets/la-production-denergie-elect
 excel_filename = "ilr-energie-centrales-de-production-canton-commune-details-v2.xlsx"
 
 try:
-    page = requests.get(public_lu_url)
-    page.raise_for_status()
-    soup = BeautifulSoup(page.content, "html.parser")
-    # Find the download button/link for the Excel file
-    link = soup.find("a", href=lambda h: h and h.endswith("ilr-energie-centrales-de-production-canton-commune-details-v2.xlsx"))
-    if link and link.has_attr("href"):
-        excel_download_url = link["href"]
-        if not excel_download_url.startswith("http"):
-            excel_download_url = "https://data.public.lu" + excel_download_url
-        response = requests.get(excel_download_url)
-        response.raise_for_status()
-        with open("data/"+excel_filename, "wb") as f:
-            f.write(response.content)
-        print(f"Downloaded latest ILR energy installations Excel file to {excel_filename}")
-    else:
-        print("Could not find Excel download link on data.public.lu page.")
+    with span('download installations workbook') as s:
+        soup = get_soup(public_lu_url)
+        # Find the download button/link for the Excel file
+        link = soup.find("a", href=lambda h: h and h.endswith("ilr-energie-centrales-de-production-canton-commune-details-v2.xlsx"))
+        if link and link.has_attr("href"):
+            excel_download_url = absolute_url(link["href"], "https://data.public.lu")
+            # Only replaces the file (and so invalidates the capacity cube) when the content changed
+            s['changed'] = download(excel_download_url, "data/"+excel_filename)
+            if s['changed']:
+                print(f"Downloaded latest ILR energy installations Excel file to {excel_filename}")
+            else:
+                print(f"ILR energy installations Excel file {excel_filename} is unchanged.")
+        else:
+            print("Could not find Excel download link on data.public.lu page.")
 except Exception as e:
     print(f"Failed to download Excel file: {e}")
 
+# Keep the changes of every workbook version, since the file itself is overwritten
+if os.path.exists("data/"+excel_filename):
+    with span('record workbook snapshot') as s:
+        recorded = record_snapshot()
+        s['rows'] = len(recorded) if recorded is not None else 0
+    if recorded is not None:
+        print(f"Recorded {len(recorded)} commune/technology capacity changes in {history_path}")
+
+# Rebuild the commune capacity cube if the workbook changed (needs the local address registry)
+if os.path.exists(addresses_path) and is_stale():
+    with span('build capacity cube'):
+        build_cube()
+    print(f"Rebuilt capacity cube in {cube_path}")
 
+# Renewable share, import dependency and capacity factors from the daily rollup and the workbook
+with span('refresh analytics', zone=country_code):
+    if refresh_analytics(store_root):
+        print(f"Updated energy indicators in {analytics_path(store_root)}")
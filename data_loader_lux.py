@@ -0,0 +1,178 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+# Raw input files used by the dashboard
+installations_path = r'data/ilr-energie-centrales-de-production-canton-commune-details-v2.xlsx'
+addresses_path = r'data/addresses.csv'
+production_path = r'data/entsoe_lux.csv'
+pdf_path = r'data/ilr-elc-pub-Communautes-Energetiques.pdf'
+
+# Parsed frames are persisted here so a fresh process does not have to re-parse the raw files
+cache_dir = r'data/cache'
+
+power_col = 'Sum of Puissance installée (kW)'
+address_cols = ['commune', 'code_postal', 'lat_wgs84', 'lon_wgs84']
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    # Without pyarrow the frames are only kept in memory
+    pyarrow = None
+
+_lock = threading.Lock()
+
+
+# Identify a file version by path, modification time and size
+def file_signature(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# path -> (signature, digest). One entry per file rather than a bounded cache, so hashing every
+# partition of a long ENTSO-E store does not evict the entries it needs again on the next call
+_digests = {}
+
+
+# Content hash of a file, recomputed only when its signature changes
+def file_digest(path):
+    signature = file_signature(path)
+    path = signature[0]
+    cached = _digests.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _digests[path] = (signature, _hash_file(path))
+    return cached[1]
+
+
+def _sources_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+# Source digests an artifact was built from, or None if it has not been built
+def artifact_sources(path):
+    meta = _sources_path(path)
+    if not (os.path.exists(path) and os.path.exists(meta)):
+        return None
+    with open(meta, encoding='utf-8') as f:
+        return json.load(f).get('sources')
+
+
+# Derived artifacts are stored next to a small JSON file with the digests of the files they were built from
+def artifact_is_stale(path, sources):
+    return artifact_sources(path) != sources
+
+
+def write_sources(path, sources):
+    with open(_sources_path(path), 'w', encoding='utf-8') as f:
+        json.dump({'sources': sources}, f, indent=1)
+
+
+def write_artifact(frame, path, sources):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    if path.endswith('.csv'):
+        frame.to_csv(tmp_path, index=False)
+    else:
+        frame.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+    write_sources(path, sources)
+
+
+def _cache_file(name, signature, ext):
+    digest = hashlib.sha1(repr(signature).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f'{name}-{digest}.{ext}')
+
+
+# Remove older cache files of the same dataset once a newer version has been written
+def _evict(name, keep):
+    if not os.path.isdir(cache_dir):
+        return
+    for fname in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, fname)
+        if fname.startswith(name + '-') and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _persisted_frame(name, signature, parse):
+    cache_path = _cache_file(name, signature, 'parquet')
+    if pyarrow is not None and os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+    frame = parse()
+    if pyarrow is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, cache_path)
+        _evict(name, cache_path)
+    return frame
+
+
+def _parse_installations(path):
+    df = pd.read_excel(path)
+    # Newer versions of the ILR workbook drop the "Sum of" prefix of the power column
+    if power_col not in df.columns and 'Puissance installée (kW)' in df.columns:
+        df = df.rename(columns={'Puissance installée (kW)': power_col})
+    return df
+
+
+def _parse_addresses(path):
+    return pd.read_csv(path, sep=';', usecols=address_cols)
+
+
+# Legacy entsoe_lux.csv: ISO timestamps with +01:00/+02:00 offsets and a second header row
+production_date_format = '%Y-%m-%d %H:%M:%S%z'
+
+
+def _parse_production(path):
+    columns = pd.read_csv(path, nrows=0).columns
+    dtypes = {col: 'float32' for col in columns[1:]}
+    dtypes[columns[0]] = str
+    prod_df = pd.read_csv(path, header=0, skiprows=[1], dtype=dtypes)
+    # Parse through UTC with a fixed format so mixed offsets do not fall back to per-element parsing
+    index = pd.to_datetime(prod_df.pop(columns[0]), format=production_date_format, utc=True)
+    return prod_df.set_axis(pd.DatetimeIndex(index).tz_convert('Europe/Brussels').rename(None))
+
+
+# In-memory layer: one entry per (dataset, file version), least recently used versions are evicted
+@functools.lru_cache(maxsize=16)
+def _load(name, path, signature):
+    with _lock:
+        if name == 'installations':
+            return _persisted_frame(name, signature, lambda: _parse_installations(path))
+        if name == 'addresses':
+            return _persisted_frame(name, signature, lambda: _parse_addresses(path))
+        if name == 'production':
+            return _persisted_frame(name, signature, lambda: _parse_production(path))
+    raise ValueError(f'Unknown dataset: {name}')
+
+
+def _load_frame(name, path):
+    # Shallow copy so callers can reassign columns or the index without touching the cached frame
+    return _load(name, path, file_signature(path)).copy(deep=False)
+
+
+def load_installations(path=installations_path):
+    return _load_frame('installations', path)
+
+
+def load_addresses(path=addresses_path):
+    return _load_frame('addresses', path)
+
+
+def load_production(path=production_path):
+    return _load_frame('production', path)
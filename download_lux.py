@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import requests
+from bs4 import BeautifulSoup
+
+# Shared HTTP session for the data download scripts (keeps connections alive between requests)
+session = requests.Session()
+session.headers.update({'User-Agent': 'stroumauer-data-update'})
+
+chunk_size = 1 << 16
+
+
+def get_soup(url, timeout=60):
+    page = session.get(url, timeout=timeout)
+    page.raise_for_status()
+    return BeautifulSoup(page.content, "html.parser")
+
+
+def absolute_url(href, base):
+    return href if href.startswith("http") else base + href
+
+
+# ETag, Last-Modified and content hash of the last download, stored next to the file
+def _state_path(dest):
+    return dest + '.json'
+
+
+def _read_state(dest):
+    path = _state_path(dest)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_state(dest, state):
+    with open(_state_path(dest), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Download url to dest, skipping the transfer when the server reports the file as unchanged
+# (ETag / If-Modified-Since) and leaving dest untouched when the payload has the same hash.
+# The new file is streamed to a temporary file and renamed into place.
+# Returns True if dest was replaced with new content.
+def download(url, dest, timeout=120):
+    state = _read_state(dest)
+    exists = os.path.exists(dest)
+    headers = {}
+    if exists and state.get('url') == url:
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest) or '.', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for block in response.iter_content(chunk_size):
+                    digest.update(block)
+                    f.write(block)
+            new_state = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'sha256': digest.hexdigest(),
+            }
+            # A missing file is always replaced, even if the committed sidecar still has its hash
+            previous = (state.get('sha256') or _sha256(dest)) if exists else None
+            changed = new_state['sha256'] != previous
+            if changed:
+                os.replace(tmp_path, dest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    _write_state(dest, new_state)
+    return changed
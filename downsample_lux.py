@@ -0,0 +1,48 @@
+import functools
+import os
+
+import pandas as pd
+
+from data_loader_lux import file_signature
+from entsoe_store_lux import manifest_name
+from query_lux import query_range, read_history, read_rollup
+
+# Resolution tiers for charting, finest first: (pandas rule, step, label).
+# Coarser tiers are averages, so values stay in MW.
+resolutions = [
+    ('15min', pd.Timedelta(minutes=15), 'quarter-hourly'),
+    ('60min', pd.Timedelta(hours=1), 'hourly'),
+    ('D', pd.Timedelta(days=1), 'daily'),
+    ('W', pd.Timedelta(weeks=1), 'weekly'),
+]
+steps = {rule: step for rule, step, _ in resolutions}
+max_points_per_trace = 3000
+
+
+# Finest resolution that keeps the number of points per trace over the given span under max_points
+def choose_resolution(span, max_points=max_points_per_trace):
+    for rule, step, label in resolutions:
+        if span / step <= max_points:
+            return rule, label
+    return resolutions[-1][0], resolutions[-1][2]
+
+
+def resample(df, rule):
+    return df.resample(rule).mean().dropna(how='all')
+
+
+# Aggregated sub-daily tier over the whole history, rebuilt only when the store manifest changes
+@functools.lru_cache(maxsize=8)
+def _tier(root, rule, columns, signature):
+    return resample(read_history(root, columns=list(columns) if columns is not None else None), rule)
+
+
+# Daily and coarser tiers come from the persisted daily rollup (see query_lux.py)
+def read_resolution(root, rule, start=None, end=None, columns=None):
+    if rule == resolutions[0][0]:
+        return query_range(root, start, end, columns=columns)
+    if steps[rule] >= pd.Timedelta(days=1):
+        return read_rollup(root, rule, start, end, columns=columns)
+    signature = file_signature(os.path.join(root, manifest_name))
+    tier = _tier(root, rule, tuple(columns) if columns is not None else None, signature)
+    return tier.loc[start:end]
@@ -0,0 +1,217 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from entsoe_store_lux import store_path, write
+
+try:
+    from entsoe.exceptions import NoMatchingDataError
+except ImportError:
+    class NoMatchingDataError(Exception):
+        pass
+
+checkpoint_name = 'backfill.json'
+
+# List of desired production types
+production_types = [
+    'Hydro Run-of-river and poundage',
+    'Biomass',
+    'Fossil Gas',
+    'Hydro Water Reservoir',
+    'Waste',
+    'Wind Onshore',
+    'Solar'
+]
+
+backfill_start = pd.Timestamp('2020-01-01T00:00', tz='Europe/Brussels')
+
+
+# Split [start, end) into calendar-month chunks
+def month_chunks(start, end):
+    bounds = [start] + list(pd.date_range(start, end, freq='MS', inclusive='neither')) + [end]
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if a < b]
+
+
+def chunk_key(chunk_start):
+    return chunk_start.strftime('%Y-%m-%d')
+
+
+# Sliding-window limit on the number of calls, shared by all threads that use the same instance
+class RateLimiter:
+    def __init__(self, max_calls, period=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.max_calls = max_calls
+        self.period = period
+        self.clock = clock
+        self.sleep = sleep
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                while self.calls and now - self.calls[0] >= self.period:
+                    self.calls.popleft()
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return
+                wait = self.period - (now - self.calls[0])
+            self.sleep(wait)
+
+
+# ENTSO-E allows 400 requests per minute and user; keep some margin for other clients of the same key
+rate_limiter = RateLimiter(max_calls=350, period=60.0)
+
+
+# Call func, retrying with exponential backoff (and jitter) on failure. Every attempt first takes
+# a slot from the shared rate limiter.
+# Returns None when ENTSO-E reports that there is no data for the window.
+def with_retry(func, retries=5, base_delay=2.0, max_delay=120.0, sleep=time.sleep, limiter=rate_limiter):
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func()
+        except NoMatchingDataError:
+            return None
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            sleep(delay * (0.5 + random.random() / 2))
+
+
+# Generation comes with (type, 'Actual Aggregated' / 'Actual Consumption') columns when a zone
+# reports consumption (e.g. pumped storage); only the produced power is kept
+def _aggregated(gen):
+    if not isinstance(gen.columns, pd.MultiIndex):
+        return gen
+    if 'Actual Aggregated' in gen.columns.get_level_values(-1):
+        return gen.xs('Actual Aggregated', axis=1, level=-1)
+    return gen.droplevel(-1, axis=1)
+
+
+# production_types=None keeps every production type reported for the zone
+def combine(gen, load, production_types):
+    if gen is None and load is None:
+        return pd.DataFrame(columns=(production_types or []) + ['Load'])
+    if gen is not None:
+        gen = _aggregated(gen)
+        if production_types is not None:
+            gen = gen[[col for col in production_types if col in gen.columns]]
+        result = gen.copy()
+    else:
+        result = pd.DataFrame(index=load.index)
+    if load is not None:
+        if isinstance(load, pd.DataFrame):
+            load = load.iloc[:, 0]
+        result['Load'] = load
+    return result
+
+
+# Fetch generation and load for one window, both through the given executor
+def fetch_window(client, country_code, start, end, production_types, executor, **retry_kwargs):
+    gen_future = executor.submit(with_retry, lambda: client.query_generation(country_code, start=start, end=end, psr_type=None), **retry_kwargs)
+    load_future = executor.submit(with_retry, lambda: client.query_load(country_code, start=start, end=end), **retry_kwargs)
+    return combine(gen_future.result(), load_future.result(), production_types)
+
+
+def _checkpoint_path(root):
+    return os.path.join(root, checkpoint_name)
+
+
+def read_checkpoint(root):
+    path = _checkpoint_path(root)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_checkpoint(root, checkpoint):
+    os.makedirs(root, exist_ok=True)
+    path = _checkpoint_path(root)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def backfill_pending(root):
+    return read_checkpoint(root) is not None
+
+
+# Download [start, end) month by month into the store. Every finished month is written to its
+# partition and recorded in backfill.json, so an interrupted run resumes where it stopped.
+# The checkpoint file is removed once all months have been fetched.
+# executor: request pool shared with other backfills (a pool of max_workers is created otherwise)
+# fetch(start, end, executor, **retry_kwargs): one month of data, generation and load by default
+def backfill(client, country_code, production_types, root=None, start=backfill_start, end=None,
+             max_workers=4, retries=5, base_delay=2.0, sleep=time.sleep, executor=None, fetch=None):
+    root = root or store_path(country_code)
+    if fetch is None:
+        def fetch(a, b, pool, **kwargs):
+            return fetch_window(client, country_code, a, b, production_types, pool, **kwargs)
+    checkpoint = read_checkpoint(root)
+    if checkpoint is None:
+        end = end or pd.Timestamp(datetime.utcnow(), tz='Europe/Brussels')
+        checkpoint = {'start': start.isoformat(), 'end': end.isoformat(), 'completed': []}
+        _write_checkpoint(root, checkpoint)
+    else:
+        # Resume the interrupted backfill over its original range
+        start = pd.Timestamp(checkpoint['start']).tz_convert('Europe/Brussels')
+        end = pd.Timestamp(checkpoint['end']).tz_convert('Europe/Brussels')
+
+    todo = [c for c in month_chunks(start, end) if chunk_key(c[0]) not in checkpoint['completed']]
+    print(f"Backfilling {len(todo)} month(s) for {country_code} "
+          f"({len(checkpoint['completed'])} already done)")
+
+    retry_kwargs = dict(retries=retries, base_delay=base_delay, sleep=sleep)
+    failed = []
+    # All requests go through one bounded pool; the chunk pool only coordinates them
+    own_pool = ThreadPoolExecutor(max_workers=max_workers) if executor is None else None
+    requests_pool = executor or own_pool
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers // 2)) as chunk_pool:
+            futures = {chunk_pool.submit(fetch, a, b, requests_pool, **retry_kwargs): (a, b) for a, b in todo}
+            for future in as_completed(futures):
+                chunk_start, chunk_end = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Failed to fetch {chunk_start:%Y-%m}: {e}")
+                    failed.append(chunk_key(chunk_start))
+                    continue
+                # Store writes happen on this thread only, so partitions and manifest stay consistent
+                write(result, root)
+                checkpoint['completed'].append(chunk_key(chunk_start))
+                _write_checkpoint(root, checkpoint)
+                print(f"Fetched {chunk_start:%Y-%m} ({len(result)} rows)")
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+    if failed:
+        raise RuntimeError(f"Backfill incomplete, {len(failed)} month(s) failed: {', '.join(sorted(failed))}. "
+                           "Run again to resume.")
+    os.remove(_checkpoint_path(root))
+
+
+if __name__ == '__main__':
+    from entsoe import EntsoePandasClient
+
+    API_KEY = os.environ.get("ENTSOE_API_KEY")
+    if not API_KEY:
+        raise ValueError("ENTSOE_API_KEY environment variable not set.")
+    # python entsoe_backfill_lux.py [start date] [zone]
+    start = pd.Timestamp(sys.argv[1], tz='Europe/Brussels') if len(sys.argv) > 1 else backfill_start
+    zone = sys.argv[2] if len(sys.argv) > 2 else 'LU'
+    backfill(EntsoePandasClient(api_key=API_KEY), zone, production_types if zone == 'LU' else None, start=start)
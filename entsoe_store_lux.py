@@ -0,0 +1,203 @@
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_loader_lux import file_signature, load_production
+
+# Partitioned storage for the ENTSO-E series: one Parquet file per (UTC) month plus a manifest
+# holding the first/last timestamp and row count of every partition.
+# Partitions hold a 'timestamp' column (int64 nanoseconds since the epoch, UTC) and float32 values.
+store_dir = r'data/entsoe'
+manifest_name = 'manifest.json'
+display_tz = 'Europe/Brussels'
+timestamp_col = 'timestamp'
+value_dtype = 'float32'
+
+
+def store_path(country_code='LU'):
+    return os.path.join(store_dir, country_code)
+
+
+def partition_key(ts):
+    return ts.tz_convert('UTC').strftime('%Y-%m')
+
+
+def _partition_file(root, key):
+    return os.path.join(root, f'{key}.parquet')
+
+
+def read_manifest(root):
+    path = os.path.join(root, manifest_name)
+    if not os.path.exists(path):
+        return {'partitions': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, manifest_name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def has_data(root):
+    return bool(read_manifest(root)['partitions'])
+
+
+# First and last stored timestamp (UTC), or (None, None) for an empty store
+def time_bounds(root):
+    partitions = read_manifest(root)['partitions']
+    if not partitions:
+        return None, None
+    first = min(pd.Timestamp(p['first']) for p in partitions.values())
+    last = max(pd.Timestamp(p['last']) for p in partitions.values())
+    return first, last
+
+
+def last_timestamp(root):
+    return time_bounds(root)[1]
+
+
+# Frame with a tz-aware index -> storage layout (int64 UTC timestamps, float32 values)
+def _to_storage(df):
+    values = df.astype(value_dtype)
+    utc = pd.DatetimeIndex(df.index).tz_convert('UTC').tz_localize(None)
+    values.insert(0, timestamp_col, utc.to_numpy().astype('datetime64[ns]').view('int64'))
+    return values.reset_index(drop=True)
+
+
+# Partitions written before the int64 layout carry their timestamps as a datetime index
+def _normalize_storage(frame):
+    if timestamp_col in frame.columns:
+        return frame
+    return _to_storage(frame)
+
+
+def _to_index(timestamps):
+    return pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).tz_convert(display_tz)
+
+
+# Positions [lo, hi) of the rows between start and end (inclusive) in a sorted int64 timestamp array
+def positions(ts, start=None, end=None):
+    lo = 0 if start is None else int(np.searchsorted(ts, pd.Timestamp(start).value, side='left'))
+    hi = len(ts) if end is None else int(np.searchsorted(ts, pd.Timestamp(end).value, side='right'))
+    return lo, max(lo, hi)
+
+
+def _load_partition(path, columns=None):
+    if columns is None:
+        return _normalize_storage(pd.read_parquet(path))
+    try:
+        # In the old layout 'timestamp' is the index name, so this also reads the index there
+        return _normalize_storage(pd.read_parquet(path, columns=[timestamp_col] + list(columns)))
+    except (KeyError, ValueError):
+        # A column missing from this partition
+        return _normalize_storage(pd.read_parquet(path)).reindex(columns=[timestamp_col] + list(columns))
+
+
+@functools.lru_cache(maxsize=64)
+def _read_partition_cached(path, signature, columns):
+    return _load_partition(path, columns)
+
+
+def _read_partition(path, columns=None):
+    return _read_partition_cached(path, file_signature(path), tuple(columns) if columns is not None else None)
+
+
+# Merge new rows into the store, rewriting only the monthly partitions they fall into.
+# Existing rows inside the time span covered by the new data are replaced.
+def write(df, root):
+    if df.empty:
+        return []
+    os.makedirs(root, exist_ok=True)
+    df = df.sort_index()
+    keys = pd.DatetimeIndex(df.index).tz_convert('UTC').strftime('%Y-%m')
+    df = _to_storage(df)
+    manifest = read_manifest(root)
+    touched = []
+    for key, part in df.groupby(keys.to_numpy()):
+        path = _partition_file(root, key)
+        if os.path.exists(path):
+            existing = _normalize_storage(pd.read_parquet(path))
+            ts = existing[timestamp_col]
+            mask = ~((ts >= part[timestamp_col].min()) & (ts <= part[timestamp_col].max()))
+            part = pd.concat([existing.loc[mask], part], ignore_index=True)
+            part = part.drop_duplicates(timestamp_col, keep='last').sort_values(timestamp_col, ignore_index=True)
+            part = part.astype({col: value_dtype for col in part.columns if col != timestamp_col})
+        tmp_path = path + '.tmp'
+        part.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        manifest['partitions'][key] = {
+            'first': pd.Timestamp(int(part[timestamp_col].iloc[0]), tz='UTC').isoformat(),
+            'last': pd.Timestamp(int(part[timestamp_col].iloc[-1]), tz='UTC').isoformat(),
+            'rows': int(len(part)),
+        }
+        touched.append(key)
+    _write_manifest(root, manifest)
+    return touched
+
+
+# Keys of the partitions holding rows between start and end (inclusive), in time order
+def _overlapping(root, start=None, end=None):
+    start = pd.Timestamp(start).tz_convert('UTC') if start is not None else None
+    end = pd.Timestamp(end).tz_convert('UTC') if end is not None else None
+    keys = []
+    for key, info in sorted(read_manifest(root)['partitions'].items()):
+        if start is not None and pd.Timestamp(info['last']) < start:
+            continue
+        if end is not None and pd.Timestamp(info['first']) > end:
+            continue
+        keys.append(key)
+    return keys
+
+
+# Value columns of the partitions between start and end, in order of first appearance. Partitions can
+# differ (a production type missing in some months), so this is read from all their Parquet schemas.
+def range_columns(root, start=None, end=None):
+    columns = {}
+    for key in _overlapping(root, start, end):
+        for name in pq.read_schema(_partition_file(root, key)).names:
+            if name != timestamp_col and not name.startswith('__index_level_'):
+                columns.setdefault(name, None)
+    return list(columns)
+
+
+# Load the rows between start and end (inclusive) reading only the partitions that overlap the range
+def read_range(root, start=None, end=None, columns=None):
+    frames = [_read_partition(_partition_file(root, key), columns) for key in _overlapping(root, start, end)]
+    if not frames:
+        return pd.DataFrame(columns=columns, index=_to_index([]))
+    df = pd.concat(frames, ignore_index=True)
+    # Partitions are sorted and read in order, so the bounds are two binary searches
+    lo, hi = positions(df[timestamp_col].to_numpy(), start, end)
+    df = df.iloc[lo:hi]
+    index = _to_index(df[timestamp_col].to_numpy())
+    return df.drop(columns=timestamp_col).set_axis(index)
+
+
+# Same rows as read_range, one frame per monthly partition, so long ranges are never held in memory at once
+def iter_range(root, start=None, end=None, columns=None):
+    for key in _overlapping(root, start, end):
+        # Read past the partition cache, which would otherwise keep the whole exported range
+        df = _load_partition(_partition_file(root, key), columns)
+        lo, hi = positions(df[timestamp_col].to_numpy(), start, end)
+        if hi > lo:
+            df = df.iloc[lo:hi]
+            yield df.drop(columns=timestamp_col).set_axis(_to_index(df[timestamp_col].to_numpy()))
+
+
+# One-off migration of the legacy single-file CSV into the partitioned store
+def import_csv(csv_path, root):
+    return write(load_production(csv_path), root)
+
+
+def ensure_store(root, csv_path=None):
+    if not has_data(root) and csv_path and os.path.exists(csv_path):
+        import_csv(csv_path, root)
+    return has_data(root)
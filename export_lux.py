@@ -0,0 +1,172 @@
+import argparse
+import sys
+
+import pandas as pd
+
+from entsoe_store_lux import display_tz, iter_range, range_columns, store_path, value_dtype
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    # Without pyarrow only CSV can be exported
+    pyarrow = None
+
+# Exports of the stored ENTSO-E series and of the installed capacity per commune.
+# The series are written one monthly partition at a time, so an export of the whole history never
+# holds more than one month in memory:
+#
+#   python export_lux.py --start 2024-01-01 --end 2024-12-31 --format parquet -o lu-2024.parquet
+#
+# format -> (file extension, MIME type)
+formats = {
+    'csv': ('csv', 'text/csv'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.stream'),
+}
+time_col = 'Time'
+
+
+def available_formats():
+    return [fmt for fmt in formats if fmt == 'csv' or pyarrow is not None]
+
+
+def file_name(name, fmt):
+    return f'{name}.{formats[fmt][0]}'
+
+
+def mime_type(fmt):
+    return formats[fmt][1]
+
+
+# File-like target for the pyarrow writers that hands out what was written since the last call
+class _Chunks:
+    closed = False
+
+    def __init__(self):
+        self.parts, self.size = [], 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _table(frame, schema=None):
+    return pyarrow.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+# Encode a sequence of frames with the same columns as one file, yielding the bytes chunk by chunk.
+# empty: frame whose columns (and types) are written when there are no frames at all
+def encode(frames, fmt, empty=None):
+    if fmt not in available_formats():
+        raise ValueError(f"Unsupported export format '{fmt}' (available: {', '.join(available_formats())})")
+    if fmt == 'csv':
+        header = True
+        for frame in frames:
+            yield frame.to_csv(index=False, header=header).encode('utf-8')
+            header = False
+        if header:
+            yield (pd.DataFrame() if empty is None else empty).to_csv(index=False).encode('utf-8')
+        return
+
+    sink, writer, schema = _Chunks(), None, None
+    for frame in frames:
+        if writer is None:
+            schema = _table(frame).schema
+            if fmt == 'parquet':
+                writer = pyarrow.parquet.ParquetWriter(sink, schema)
+            else:
+                writer = pyarrow.ipc.new_stream(sink, schema)
+        # One Parquet row group / Arrow record batch per frame
+        writer.write_table(_table(frame, schema))
+        yield sink.take()
+    if writer is None:
+        schema = _table(pd.DataFrame() if empty is None else empty).schema
+        writer = (pyarrow.parquet.ParquetWriter if fmt == 'parquet' else pyarrow.ipc.new_stream)(sink, schema)
+    writer.close()
+    yield sink.take()
+
+
+# [start, end] covering the whole days first_day to last_day (inclusive) in display time
+def day_range(first_day, last_day):
+    start = pd.Timestamp(first_day).tz_localize(display_tz) if first_day is not None else None
+    end = pd.Timestamp(last_day).tz_localize(display_tz) + pd.Timedelta(days=1) - pd.Timedelta(1) if last_day is not None else None
+    return start, end
+
+
+# Store rows between start and end (inclusive), one frame per monthly partition, with the time as a column.
+# Every frame has the same columns in the same order: the given ones, or all columns of the partitions
+# in the range, missing ones filled with NaN.
+def production_chunks(root, start=None, end=None, columns=None):
+    columns = list(columns) if columns is not None else range_columns(root, start, end)
+    for frame in iter_range(root, start, end, columns):
+        frame = frame.reindex(columns=columns).astype(value_dtype)
+        yield frame.rename_axis(time_col).reset_index()
+
+
+def export_production(root, start=None, end=None, columns=None, fmt='csv'):
+    columns = list(columns) if columns is not None else range_columns(root, start, end)
+    empty = pd.DataFrame({col: pd.Series(dtype=value_dtype) for col in columns})
+    empty.insert(0, time_col, pd.Series(dtype=f'datetime64[ns, {display_tz}]'))
+    return encode(production_chunks(root, start, end, columns), fmt, empty)
+
+
+# Installed power per commune (kW), one column per technology, from the capacity cube
+def commune_table(cube, commune_col='Commune', type_col="Type d'installation",
+                  power_col='Sum of Puissance installée (kW)'):
+    power = cube.pivot_table(index=commune_col, columns=type_col, values=power_col, aggfunc='sum', fill_value=0)
+    power.columns = [f'{t} (kW)' for t in power.columns]
+    power.insert(0, 'Total (kW)', power.sum(axis=1))
+    totals = cube.groupby(commune_col).agg({'Installations': 'sum', 'Latitude': 'first', 'Longitude': 'first'})
+    return totals.join(power).reset_index()
+
+
+def export_communes(cube, fmt='csv'):
+    return encode([commune_table(cube)], fmt)
+
+
+def write_file(chunks, path):
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the stored ENTSO-E series or the capacity per commune.')
+    parser.add_argument('--zone', default='LU', help='Store to export (data/entsoe/<zone>)')
+    parser.add_argument('--start', help='First day (Europe/Brussels), default: start of the store')
+    parser.add_argument('--end', help='Last day (Europe/Brussels, inclusive), default: end of the store')
+    parser.add_argument('--columns', nargs='+', help='Series to export, default: all')
+    parser.add_argument('--communes', action='store_true', help='Export the installed capacity per commune instead')
+    parser.add_argument('--format', choices=list(formats), default='csv')
+    parser.add_argument('-o', '--output', required=True, help='Output file')
+    args = parser.parse_args(argv)
+
+    if args.communes:
+        from capacity_cube_lux import load_cube
+        chunks = export_communes(load_cube(), args.format)
+    else:
+        start, end = day_range(args.start, args.end)
+        chunks = export_production(store_path(args.zone), start, end, args.columns, args.format)
+    write_file(chunks, args.output)
+    print(f"Exported to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
-import requests
-from bs4 import BeautifulSoup
+from communities_pdf_lux import communities_path, refresh_communities
+from download_lux import absolute_url, download, get_soup
 
 
 # Routine to download the latest Communautés énergétiques PDF from ILR
@@ -7,27 +7,29 @@ ilr_url = "https://www.ilr.lu/publications/liste-des-communautes-energetiques/"
 pdf_filename = "ilr-elc-pub-Communautes-Energetiques.pdf"
 
 try:
-    page = requests.get(ilr_url)
-    page.raise_for_status()
-    soup = BeautifulSoup(page.content, "html.parser")
+    soup = get_soup(ilr_url)
     # Find the download button/link for the PDF
     link = soup.find("a", string=lambda s: s and "Télécharger" in s)
     if not link:
         # Fallback: look for any PDF link on the page
         link = soup.find("a", href=lambda h: h and h.endswith(".pdf"))
     if link and link.has_attr("href"):
-        pdf_download_url = link["href"]
-        if not pdf_download_url.startswith("http"):
-            pdf_download_url = "https://www.ilr.lu" + pdf_download_url
-        response = requests.get(pdf_download_url)
-        response.raise_for_status()
-        with open("data/"+pdf_filename, "wb") as f:
-            f.write(response.content)
-        print(f"Downloaded latest Communautés énergétiques PDF to data/{pdf_filename}")
+        pdf_download_url = absolute_url(link["href"], "https://www.ilr.lu")
+        # Only replaces the file when the content changed, so the parsed list is not rebuilt needlessly
+        if download(pdf_download_url, "data/"+pdf_filename):
+            print(f"Downloaded latest Communautés énergétiques PDF to data/{pdf_filename}")
+        else:
+            print(f"Communautés énergétiques PDF data/{pdf_filename} is unchanged.")
     else:
         print("Could not find PDF download link on ILR page.")
 except Exception as e:
     print(f"Failed to download PDF: {e}")
 
-
-
+# Parse the list once per new PDF so the dashboard only reads the resulting CSV
+try:
+    if refresh_communities():
+        print(f"Parsed energy communities written to {communities_path}")
+    else:
+        print("Energy communities list is up to date.")
+except Exception as e:
+    print(f"Failed to parse PDF: {e}")
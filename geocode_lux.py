@@ -0,0 +1,81 @@
+import functools
+import os
+
+import pandas as pd
+
+from data_loader_lux import (addresses_path, artifact_is_stale, cache_dir, file_digest, file_signature,
+                             load_addresses, write_artifact)
+
+# Commune and postcode centroids from the national address registry, so the maps do not need
+# the full addresses.csv. Rebuilt only when addresses.csv changes.
+index_path = os.path.join(cache_dir, 'geocode_index.parquet')
+
+
+# Accent-, case- and separator-insensitive key for commune names ("Esch-sur-Alzette" == "esch sur alzette")
+def name_key(series):
+    key = series.astype(str).str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
+    return key.str.lower().str.replace(r'[\s\-]+', ' ', regex=True).str.strip()
+
+
+def postcode_key(series):
+    return series.astype(str).str.extract(r'(\d{4})', expand=False)
+
+
+def _sources(addresses=addresses_path):
+    return {'addresses': file_digest(addresses)}
+
+
+def is_stale(path=index_path, addresses=addresses_path):
+    return artifact_is_stale(path, _sources(addresses))
+
+
+def build_index(path=index_path, addresses=addresses_path):
+    adresses_df = load_addresses(addresses)
+    adresses_df = adresses_df.assign(
+        commune_key=name_key(adresses_df['commune']),
+        postcode=postcode_key(adresses_df['code_postal']),
+    )
+    agg = {'lat_wgs84': 'mean', 'lon_wgs84': 'mean', 'commune': 'first', 'code_postal': 'size'}
+    communes = adresses_df.groupby('commune_key', as_index=False).agg(agg).rename(columns={'commune_key': 'key'})
+    communes['kind'] = 'commune'
+    postcodes = adresses_df.dropna(subset=['postcode']).groupby('postcode', as_index=False).agg(agg)
+    postcodes = postcodes.rename(columns={'postcode': 'key'})
+    postcodes['kind'] = 'postcode'
+    index = pd.concat([communes, postcodes], ignore_index=True).rename(columns={
+        'commune': 'Commune', 'lat_wgs84': 'Latitude', 'lon_wgs84': 'Longitude', 'code_postal': 'Addresses'})
+    index = index[['kind', 'key', 'Commune', 'Latitude', 'Longitude', 'Addresses']]
+    write_artifact(index, path, _sources(addresses))
+    return index
+
+
+@functools.lru_cache(maxsize=4)
+def _read_index(path, signature):
+    index = pd.read_parquet(path)
+    return {kind: part.set_index('key')[['Latitude', 'Longitude']] for kind, part in index.groupby('kind')}
+
+
+def load_index(path=index_path):
+    # Without addresses.csv (it is not part of the repository) the last built index is used as-is
+    if not os.path.exists(path) or (os.path.exists(addresses_path) and is_stale(path)):
+        build_index(path)
+    return _read_index(path, file_signature(path))
+
+
+def _lookup(kind, keys):
+    centroids = load_index()[kind]
+    return centroids.reindex(keys.to_numpy()).set_axis(keys.index)
+
+
+# Latitude/Longitude for each commune name, NaN where the commune is unknown
+def lookup_communes(names):
+    return _lookup('commune', name_key(pd.Series(names)))
+
+
+# Latitude/Longitude for each postcode ("L-1234", "1234" or 1234), NaN where the postcode is unknown
+def lookup_postcodes(postcodes):
+    return _lookup('postcode', postcode_key(pd.Series(postcodes)))
+
+
+if __name__ == '__main__':
+    index = build_index()
+    print(f"Geocoding index with {len(index)} entries written to {index_path}")
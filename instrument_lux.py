@@ -0,0 +1,134 @@
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# Lightweight timing spans for the dashboard and the update scripts.
+# Disabled by default; set STROUMAUER_PROFILE=1 to record spans for the whole process
+# (and STROUMAUER_PROFILE_LOG to choose the JSON lines log file).
+log_path = os.environ.get('STROUMAUER_PROFILE_LOG', os.path.join('data', 'cache', 'profile.jsonl'))
+_enabled = os.environ.get('STROUMAUER_PROFILE', '').lower() in ('1', 'true', 'yes')
+_local = threading.local()
+_log_lock = threading.Lock()
+
+try:
+    import psutil
+    _process = psutil.Process()
+except ImportError:
+    _process = None
+
+
+def _rss_mb():
+    if _process is not None:
+        return _process.memory_info().rss / 2 ** 20
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+# Record spans on the current thread only (e.g. a single Streamlit session run)
+def enable_for_thread(enabled=True):
+    _local.enabled = enabled
+
+
+def is_enabled():
+    return _enabled or getattr(_local, 'enabled', False)
+
+
+# Spans recorded on this thread since the last reset()
+def records():
+    return list(getattr(_local, 'records', []))
+
+
+def reset():
+    _local.records = []
+    _local.stack = []
+
+
+def _write_log(record):
+    with _log_lock:
+        os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+class _NoSpan:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_no_span = _NoSpan()
+
+
+class _Span:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self.name)
+        self.rss = _rss_mb()
+        self.start = time.perf_counter()
+        return self.fields
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        rss = _rss_mb()
+        stack = _local.stack
+        stack.pop()
+        record = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'span': '/'.join(stack + [self.name]),
+            'ms': round(duration * 1000, 2),
+            'rows': self.fields.pop('rows', None),
+            'rss_mb': round(rss, 1) if rss is not None else None,
+            'rss_delta_mb': round(rss - self.rss, 1) if rss is not None and self.rss is not None else None,
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        record.update(self.fields)
+        if not hasattr(_local, 'records'):
+            _local.records = []
+        _local.records.append(record)
+        _write_log(record)
+        return False
+
+
+# Time a block; the yielded dict can receive 'rows' and any extra fields to log
+#
+#   with span('load installations') as s:
+#       df = load_installations()
+#       s['rows'] = len(df)
+def span(name, **fields):
+    if not is_enabled():
+        return _no_span
+    return _Span(name, fields)
+
+
+def timed(name=None):
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            with span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader_lux import (artifact_is_stale, cache_dir, file_digest, file_signature, installations_path,
+                             load_installations, power_col, write_artifact)
+
+# Size distribution of the PV installations in the ILR workbook.
+# Small sets are drawn as one marker per installation, larger ones with WebGL and above
+# webgl_max_rows as a log-binned histogram that is computed once per workbook version.
+pv_type = 'Installation photovoltaïque'
+type_col = "Type d'installation"
+size_col = 'Installed Power (kW)'
+bins_path = os.path.join(cache_dir, 'pv_size_bins.parquet')
+bins_per_decade = 10
+
+svg_max_rows = 5000
+webgl_max_rows = 50000
+
+
+# 'svg' (one marker per installation), 'webgl' (same, drawn with scattergl) or 'histogram'
+def render_mode(rows, svg_max=None, webgl_max=None):
+    if rows <= (svg_max_rows if svg_max is None else svg_max):
+        return 'svg'
+    if rows <= (webgl_max_rows if webgl_max is None else webgl_max):
+        return 'webgl'
+    return 'histogram'
+
+
+# PV installation sizes with a fixed vertical jitter, so the layout is stable between reruns
+@functools.lru_cache(maxsize=4)
+def _points(path, signature):
+    df = load_installations(path)
+    sizes = df.loc[df[type_col] == pv_type, power_col].dropna().astype(float).to_numpy()
+    jitter = np.random.RandomState(42).uniform(-0.5, 0.5, size=len(sizes))
+    return pd.DataFrame({size_col: sizes, 'y': jitter})
+
+
+def load_points(installations=installations_path):
+    return _points(installations, file_signature(installations)).copy(deep=False)
+
+
+# Histogram with bins_per_decade logarithmic bins between the smallest and largest positive size
+def log_bins(sizes, per_decade=bins_per_decade):
+    sizes = sizes[sizes > 0]
+    if sizes.empty:
+        return pd.DataFrame(columns=['Lower (kW)', 'Upper (kW)', 'Installations', 'Installed power (kW)'])
+    lo, hi = np.floor(np.log10(sizes.min())), np.ceil(np.log10(sizes.max()))
+    edges = np.logspace(lo, hi, int((hi - lo) * per_decade) + 1)
+    counts, _ = np.histogram(sizes, bins=edges)
+    power, _ = np.histogram(sizes, bins=edges, weights=sizes)
+    bins = pd.DataFrame({
+        'Lower (kW)': edges[:-1],
+        'Upper (kW)': edges[1:],
+        'Installations': counts,
+        'Installed power (kW)': power,
+    })
+    # Drop the empty bins before the smallest and after the largest installation
+    filled = np.flatnonzero(counts)
+    return bins.iloc[filled[0]:filled[-1] + 1].reset_index(drop=True)
+
+
+def _sources(installations=installations_path):
+    return {'installations': file_digest(installations)}
+
+
+def build_bins(path=bins_path, installations=installations_path):
+    bins = log_bins(load_points(installations)[size_col])
+    write_artifact(bins, path, _sources(installations))
+    return bins
+
+
+@functools.lru_cache(maxsize=4)
+def _read_bins(path, signature):
+    return pd.read_parquet(path)
+
+
+def load_bins(path=bins_path, installations=installations_path):
+    if artifact_is_stale(path, _sources(installations)):
+        build_bins(path, installations)
+    return _read_bins(path, file_signature(path)).copy(deep=False)
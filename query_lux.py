@@ -0,0 +1,90 @@
+import functools
+import os
+
+import pandas as pd
+
+from data_loader_lux import artifact_sources, file_digest, file_signature, write_artifact
+from entsoe_store_lux import (_partition_file, _read_partition, _to_index, has_data, manifest_name, read_manifest,
+                              read_range, timestamp_col)
+
+# Range queries over the ENTSO-E store.
+# A [start, end] query only reads the monthly partitions that overlap it (binary searches inside them),
+# so its cost does not grow with the length of the history. Ranges of a day or coarser are answered from
+# daily sums and counts kept in <root>/rollup_daily.parquet, which is updated one partition at a time.
+rollup_name = 'rollup_daily.parquet'
+
+
+def _manifest_signature(root):
+    path = os.path.join(root, manifest_name)
+    return file_signature(path) if os.path.exists(path) else None
+
+
+@functools.lru_cache(maxsize=4)
+def _history(root, signature):
+    frames = [_read_partition(_partition_file(root, key)) for key in sorted(read_manifest(root)['partitions'])]
+    history = pd.concat(frames, ignore_index=True)
+    ts = history.pop(timestamp_col).to_numpy()
+    return history.set_axis(_to_index(ts)), ts
+
+
+# Rows between start and end (inclusive) at full resolution
+def query_range(root, start=None, end=None, columns=None):
+    return read_range(root, start, end, columns)
+
+
+# The whole full-resolution history as one frame, cached until the store changes. Only for readers
+# that need all of it (the resampled tiers, validation); it must not be modified in place.
+def read_history(root, columns=None):
+    if not has_data(root):
+        return read_range(root, columns=columns)
+    history, _ = _history(root, _manifest_signature(root))
+    return history if columns is None else history.reindex(columns=columns)
+
+
+def rollup_path(root):
+    return os.path.join(root, rollup_name)
+
+
+# Daily sums and value counts of one partition, one row per (stat, day) with days in display time
+def _partition_rollup(root, key):
+    frame = _read_partition(_partition_file(root, key))
+    days = _to_index(frame[timestamp_col].to_numpy()).normalize()
+    grouped = frame.drop(columns=timestamp_col).astype('float64').groupby(days)
+    rollup = pd.concat({'sum': grouped.sum(), 'count': grouped.count()}, names=['stat', 'day'])
+    return rollup.reset_index().assign(partition=key)
+
+
+# Recompute the daily rollup for the partitions whose content changed since the last run
+def refresh_rollup(root):
+    path = rollup_path(root)
+    keys = sorted(read_manifest(root)['partitions'])
+    sources = {key: file_digest(_partition_file(root, key)) for key in keys}
+    previous = artifact_sources(path) or {}
+    if previous == sources and os.path.exists(path):
+        return []
+    changed = [key for key in keys if previous.get(key) != sources[key]]
+    frames = [_partition_rollup(root, key) for key in changed]
+    if previous:
+        kept = pd.read_parquet(path)
+        frames.insert(0, kept[kept['partition'].isin(set(keys) - set(changed))])
+    write_artifact(pd.concat(frames, ignore_index=True), path, sources)
+    return changed
+
+
+# Mean values per period of the given rule (daily or coarser) over the whole history
+@functools.lru_cache(maxsize=8)
+def _rollup(path, signature, rule):
+    totals = pd.read_parquet(path).drop(columns='partition').groupby(['stat', 'day']).sum()
+    sums, counts = totals.loc['sum'], totals.loc['count']
+    if rule != 'D':
+        sums, counts = sums.resample(rule).sum(), counts.resample(rule).sum()
+    return (sums / counts.where(counts > 0)).dropna(how='all').rename_axis(None)
+
+
+def read_rollup(root, rule='D', start=None, end=None, columns=None):
+    if not has_data(root):
+        return read_range(root, columns=columns)
+    refresh_rollup(root)
+    path = rollup_path(root)
+    result = _rollup(path, file_signature(path), rule).loc[start:end]
+    return result if columns is None else result.reindex(columns=columns)
@@ -5,52 +5,36 @@ import time
 import os
 from streamlit import columns
 
-# Load the Excel file
-file_path = r'data/ilr-energie-centrales-de-production-canton-commune-details-v2.xlsx'
-df = pd.read_excel(file_path)
+from analytics_lux import capacity_types
+from artifacts_lux import has_artifact, load_manifest, read_artifact
+from downsample_lux import choose_resolution, resolutions
+from entsoe_store_lux import display_tz
+from export_lux import available_formats, day_range, export_communes, export_production, file_name, mime_type
+from instrument_lux import enable_for_thread, is_enabled, records, reset, span
+from pv_sizes_lux import render_mode
+from query_lux import query_range
+
+# Per-stage timings for this run (STROUMAUER_PROFILE=1 for all runs, or ?profile=1 in the URL)
+enable_for_thread(st.query_params.get('profile') == '1')
+reset()
+
+# All datasets are precomputed by build_artifacts_lux.py; this script only reads the published version
+with span('load artifact manifest'):
+    manifest = load_manifest()
+    if manifest is None:
+        # Fresh checkout without published artifacts: build them once
+        from build_artifacts_lux import build_artifacts
+        with st.spinner('Building dashboard datasets...'):
+            build_artifacts()
+        manifest = load_manifest()
+if manifest is None:
+    st.error("No dashboard datasets have been published (run build_artifacts_lux.py).")
+    st.stop()
 
-# Filter for photovoltaics only
 pv_type_col = "Type d'installation"
-df = df[df[pv_type_col] == 'Installation photovoltaïque']
-
-# Group by 'Commune' and sum the 'Puissance (kW)' column (assuming this is the power column)
 power_col = 'Sum of Puissance installée (kW)'
 commune_col = 'Commune'
 
-if commune_col in df.columns and power_col in df.columns:
-    df_grouped = df.groupby(commune_col, as_index=False)[power_col].sum()
-else:
-    st.error(f"Could not find columns '{commune_col}' and/or '{power_col}' in the data.")
-    st.stop()
-
-# Load coordinates from adresses.csv instead of geopy
-adresses_path = r'data/addresses.csv'
-adresses_df = pd.read_csv(adresses_path, sep=";")
-# Only keep relevant columns and average lat/lon per commune
-adresses_df = adresses_df[['commune', 'lat_wgs84', 'lon_wgs84']]
-adresses_df = adresses_df.groupby('commune', as_index=False).agg({'lat_wgs84': 'mean', 'lon_wgs84': 'mean'})
-# Ensure column names are lower case for merge
-adresses_df.columns = [c.lower() for c in adresses_df.columns]
-# Merge on commune name (case-insensitive)
-
-
-df_grouped = pd.merge(
-    df_grouped,
-    adresses_df.rename(columns={'commune': commune_col, 'lat_wgs84': 'Latitude', 'lon_wgs84': 'Longitude'}),
-    on=commune_col,
-    how='left'
-)
-# Remove communes where coordinates are missing
-for col in ['Latitude', 'Longitude']:
-    df_grouped[col] = pd.to_numeric(df_grouped[col], errors='coerce')
-df_grouped = df_grouped.dropna(subset=['Latitude', 'Longitude'])
-
-# Before displaying the dataframe, ensure all columns are string or numeric and handle special characters
-for col in df_grouped.columns:
-    if df_grouped[col].dtype == object:
-        df_grouped[col] = df_grouped[col].astype(str)
-        df_grouped[col] = df_grouped[col].str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
-
 # Streamlit app
 st.title('ILR Energie Centrales de Production - Power by Commune')
 st.write('This app displays the total installed power per commune in Luxembourg.')
@@ -62,132 +46,77 @@ energy_types = {
     'Biomasse solide': {'color': 'rgb(144, 238, 144)', 'label': 'Biomass'},
     'Hydro': {'color': 'rgb(31, 119, 180)', 'label': 'Hydro'}
 }
-
-# Load and concatenate all types
+# Keep the technologies shown on the map (all hydro plant types are merged into 'Hydro' in the cube)
 all_types = list(energy_types.keys())
-df_all = pd.read_excel(file_path)
-df_hydro = df_all[df_all[pv_type_col].str.contains('Hydro', case=False, na=False)].copy()
-df_hydro[pv_type_col] = 'Hydro'
-df_other = df_all[df_all[pv_type_col].isin([t for t in all_types if t != 'Hydro'])].copy()
-df_combined = pd.concat([df_other, df_hydro], ignore_index=True)
-
-# Group by commune and technology
-df_combined_grouped = df_combined.groupby([commune_col, pv_type_col], as_index=False)[power_col].sum()
-df_combined_grouped = pd.merge(
-    df_combined_grouped,
-    adresses_df.rename(columns={'commune': commune_col, 'lat_wgs84': 'Latitude', 'lon_wgs84': 'Longitude'}),
-    on=commune_col,
-    how='left'
-)
-for col in ['Latitude', 'Longitude']:
-    df_combined_grouped[col] = pd.to_numeric(df_combined_grouped[col], errors='coerce')
-df_combined_grouped = df_combined_grouped.dropna(subset=['Latitude', 'Longitude'])
-for col in df_combined_grouped.columns:
-    if df_combined_grouped[col].dtype == object:
-        df_combined_grouped[col] = df_combined_grouped[col].astype(str)
-        df_combined_grouped[col] = df_combined_grouped[col].str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
-
-color_map = {k: v['color'] for k, v in energy_types.items()}
-fig_all_installed = px.scatter_mapbox(
-    df_combined_grouped,
-    lat='Latitude',
-    lon='Longitude',
-    size=power_col,
-    color=pv_type_col,
-    color_discrete_map=color_map,
-    hover_name=commune_col,
-    size_max=30,
-    zoom=8,
-    mapbox_style='open-street-map',
-    title='Total Installed Power by Commune and Technology (Map)'
-)
-fig_all_installed.update_layout(height=800, width=800)
-st.markdown('---')
-st.subheader('Total Installed Power by Commune and Technology')
-st.plotly_chart(fig_all_installed, use_container_width=True)
-
-
-# --- Actual production chart from CSV ---
-import matplotlib.pyplot as plt
-
-csv_path = r"data/entsoe_lux.csv"
-prod_cols = ['Load', 'Hydro Run-of-river and poundage', 'Wind Onshore', 'Solar', "Biomass", 'Fossil Gas', 'Waste']
 
-# Read CSV, skip the second row (header=0, skiprows=[1])
-prod_df = pd.read_csv(csv_path, header=0, skiprows=[1], index_col=0)
-prod_df = prod_df[prod_cols]  # Filter to keep only relevant columns
 
-# Convert date column to datetime
-prod_df.index = pd.to_datetime(prod_df.index)
-
-# --- Add filter for day, week, month, year, or custom range ---
-st.markdown('---')
-st.subheader('Actual Electricity Production in Luxembourg')
-
-now = prod_df.index.max()
-default_start = now - pd.Timedelta(days=7)
-default_end = now
-
-col1, col2 = st.columns(2)
-with col1:
-    user_start = st.date_input("Start date", value=default_start.date(), min_value=prod_df.index.min().date(), max_value=now.date())
-with col2:
-    user_end = st.date_input("End date", value=default_end.date(), min_value=prod_df.index.min().date(), max_value=now.date())
-
-# Ensure prod_df.index and user_start_dt/user_end_dt are both tz-naive or both tz-aware
-user_start_dt = pd.to_datetime(user_start)
-user_end_dt = pd.to_datetime(user_end)
-
-# Convert prod_df.index to DatetimeIndex if not already, handling tz-aware objects
-if not isinstance(prod_df.index, pd.DatetimeIndex):
-    # If any tz-aware datetimes, convert to UTC first
-    if any(hasattr(x, 'tzinfo') and x.tzinfo is not None for x in prod_df.index):
-        prod_df.index = pd.to_datetime(prod_df.index, utc=True)
-    else:
-        prod_df.index = pd.to_datetime(prod_df.index)
+def installed_capacity_section():
+    if not has_artifact(manifest, 'capacity_cube'):
+        st.error("The installed capacity per commune has not been built (see build_artifacts_lux.py).")
+        return
+
+    # Installed power per commune and technology with coordinates and normalised names (see capacity_cube_lux.py)
+    with span('load capacity cube') as s:
+        cube = read_artifact(manifest, 'capacity_cube')
+        s['rows'] = len(cube)
+
+    df_combined_grouped = cube[cube[pv_type_col].isin(all_types)]
+    color_map = {k: v['color'] for k, v in energy_types.items()}
+    with span('installed capacity map', rows=len(df_combined_grouped)):
+        fig_all_installed = px.scatter_mapbox(
+            df_combined_grouped,
+            lat='Latitude',
+            lon='Longitude',
+            size=power_col,
+            color=pv_type_col,
+            color_discrete_map=color_map,
+            hover_name=commune_col,
+            size_max=30,
+            zoom=8,
+            mapbox_style='open-street-map',
+            title='Total Installed Power by Commune and Technology (Map)'
+        )
+        fig_all_installed.update_layout(height=800, width=800)
+        st.subheader('Total Installed Power by Commune and Technology')
+        st.plotly_chart(fig_all_installed, use_container_width=True)
+
+    with st.expander('Download the installed power per commune'):
+        export_format = st.radio('Format', available_formats(), horizontal=True, key='communes_export_format')
+        st.download_button(
+            'Download',
+            data=lambda: b''.join(export_communes(cube, export_format)),
+            file_name=file_name('installed-power-per-commune', export_format),
+            mime=mime_type(export_format),
+            on_click='ignore',
+        )
 
-index_tz = getattr(prod_df.index, 'tz', None)
+    # --- Installed capacity over time, replayed from the recorded workbook changes (see capacity_history_lux.py) ---
+    with span('capacity timeline') as s:
+        timeline = read_artifact(manifest, 'capacity_timeline') if has_artifact(manifest, 'capacity_timeline') else pd.DataFrame()
+        s['rows'] = len(timeline)
+    if not timeline.empty:
+        # Same technology grouping as the map: all hydro plant types together
+        timeline = timeline.T.groupby(lambda t: 'Hydro' if 'hydro' in t.lower() else t).sum().T
+        timeline = timeline.reindex(columns=all_types).dropna(axis=1, how='all')
+        fig_timeline = px.line(
+            timeline.rename(columns={k: v['label'] for k, v in energy_types.items()}),
+            labels={'Date': 'Date', 'value': 'Installed power (MW)', 'variable': 'Technology'},
+            color_discrete_map={v['label']: v['color'] for v in energy_types.values()},
+            line_shape='hv',
+            markers=len(timeline) < 30,
+            title='Installed Capacity over Time (ILR workbook versions)',
+        )
+        fig_timeline.update_layout(template='plotly_white', height=400)
+        st.markdown('---')
+        st.subheader('Installed Capacity over Time')
+        st.plotly_chart(fig_timeline, use_container_width=True)
 
-# Convert prod_df.index to DatetimeIndex if not already
-if not isinstance(prod_df.index, pd.DatetimeIndex):
-    prod_df.index = pd.to_datetime(prod_df.index)
 
-if index_tz is not None:
-    # If index is tz-aware, localize user dates to the same tz
-    if user_start_dt.tzinfo is None:
-        user_start_dt = user_start_dt.tz_localize(index_tz)
-    else:
-        user_start_dt = user_start_dt.tz_convert(index_tz)
-    if user_end_dt.tzinfo is None:
-        user_end_dt = user_end_dt.tz_localize(index_tz)
-    else:
-        user_end_dt = user_end_dt.tz_convert(index_tz)
-    # Ensure prod_df.index is tz-aware
-    if prod_df.index.tz is None:
-        prod_df.index = prod_df.index.tz_localize(index_tz)
-else:
-    # If index is tz-naive, make user dates tz-naive and prod_df.index tz-naive
-    if user_start_dt.tzinfo is not None:
-        user_start_dt = user_start_dt.tz_convert(None)
-    if user_end_dt.tzinfo is not None:
-        user_end_dt = user_end_dt.tz_convert(None)
-    if hasattr(prod_df.index, 'tz') and prod_df.index.tz is not None:
-        prod_df.index = prod_df.index.tz_convert(None)
-
-if user_start_dt > user_end_dt:
-    st.warning("Start date must be before end date.")
-    mask = slice(None)
-else:
-    mask = (prod_df.index >= user_start_dt) & (prod_df.index <= user_end_dt)
-
-prod_df_filtered = prod_df.loc[mask]
-
-# Plot using Plotly for Streamlit (stacked area for production, line for Load)
+# --- Actual production chart from CSV ---
+import matplotlib.pyplot as plt
 import plotly.graph_objects as go
-fig_prod = go.Figure()
 
-# Define production columns (excluding 'Load')
-production_cols = [col for col in prod_cols if col != 'Load']
+prod_cols = ['Load', 'Hydro Run-of-river and poundage', 'Wind Onshore', 'Solar', "Biomass", 'Fossil Gas', 'Waste']
 # Assign custom colors: Solar (yellow), Wind (light blue), Biomass (green), others as you wish
 custom_colors = {
     'Solar': '#FFD700',            # yellow
@@ -198,181 +127,309 @@ custom_colors = {
     'Waste': '#8B4513'
 }
 
-# Add stacked area traces for production
-for col in production_cols:
-    fig_prod.add_trace(go.Scatter(
-        x=prod_df_filtered.index,
-        y=prod_df_filtered[col],
-        mode='lines',
-        name=col,
-        stackgroup='one',
-        line=dict(width=0.5, color=custom_colors.get(col, None)),
-        fill='tonexty',
-        groupnorm=None
-    ))
-# Add Load as a line on top
-fig_prod.add_trace(go.Scatter(
-    x=prod_df_filtered.index,
-    y=prod_df_filtered['Load'],
-    mode='lines',
-    name='Load',
-    line=dict(width=2, color='black'),
-    fill=None
-))
-fig_prod.update_layout(title='Actual Electricity Production in Luxembourg',
-                      xaxis_title='Date (GMT+2)',
-                      yaxis_title='Power (MW)',
-                      height=500,
-                      legend_title='Source',
-                      template='plotly_white')
-st.plotly_chart(fig_prod, use_container_width=True)
-
 
-# --- Plot number of added cooperatives per month from PDF ---
-import re
-from collections import Counter
-import matplotlib.dates as mdates
+# The date range only reruns this section: the production chart and the neighbour comparison that share it
+@st.fragment
+def production_section():
+    # Store location and time span as of the artifact build
+    store_root = manifest['store']['root']
+    if manifest['store']['last'] is None:
+        st.error(f"No ENTSO-E production data found in '{store_root}'.")
+        return
+    first_ts, last_ts = pd.Timestamp(manifest['store']['first']), pd.Timestamp(manifest['store']['last'])
+
+    # --- Add filter for day, week, month, year, or custom range ---
+    st.subheader('Actual Electricity Production in Luxembourg')
+
+    now = last_ts.tz_convert(display_tz)
+    default_start = now - pd.Timedelta(days=7)
+    default_end = now
+    min_date = first_ts.tz_convert(display_tz).date()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        user_start = st.date_input("Start date", value=default_start.date(), min_value=min_date, max_value=now.date())
+    with col2:
+        user_end = st.date_input("End date", value=default_end.date(), min_value=min_date, max_value=now.date())
+
+    full_resolution = st.checkbox("Full resolution (slow for long ranges)", value=False)
+
+    if user_start > user_end:
+        st.warning("Start date must be before end date.")
+        range_start, range_end = None, None
+        selected_span = last_ts - first_ts
+    else:
+        # The store returns a tz-aware index, so the selected days are taken in the same timezone,
+        # from the start of the start date to the end of the end date
+        range_start, range_end = day_range(user_start, user_end)
+        selected_span = range_end - range_start
+
+    # Long ranges are drawn from precomputed hourly/daily/weekly averages to cap the points per trace
+    if full_resolution:
+        resolution, resolution_label = resolutions[0][0], resolutions[0][2]
+    else:
+        resolution, resolution_label = choose_resolution(selected_span)
+    # Quarter-hours are sliced from the store by binary search, coarser tiers come from the published tables
+    with span('read production range', resolution=resolution) as s:
+        if resolution == resolutions[0][0]:
+            prod_df_filtered = query_range(store_root, range_start, range_end, columns=prod_cols)
+        else:
+            prod_df_filtered = read_artifact(manifest, f'production_{resolution}', start=range_start, end=range_end)
+            prod_df_filtered = prod_df_filtered.reindex(columns=prod_cols)
+        s['rows'] = len(prod_df_filtered)
+    if resolution != resolutions[0][0]:
+        st.caption(f"Showing {resolution_label} averages over the selected range.")
+
+    # Plot using Plotly for Streamlit (stacked area for production, line for Load)
+    with span('production figure', rows=len(prod_df_filtered)):
+        fig_prod = go.Figure()
+
+        # Define production columns (excluding 'Load')
+        production_cols = [col for col in prod_cols if col != 'Load']
+
+        # Add stacked area traces for production
+        for col in production_cols:
+            fig_prod.add_trace(go.Scatter(
+                x=prod_df_filtered.index,
+                y=prod_df_filtered[col],
+                mode='lines',
+                name=col,
+                stackgroup='one',
+                line=dict(width=0.5, color=custom_colors.get(col, None)),
+                fill='tonexty',
+                groupnorm=None
+            ))
+        # Add Load as a line on top
+        fig_prod.add_trace(go.Scatter(
+            x=prod_df_filtered.index,
+            y=prod_df_filtered['Load'],
+            mode='lines',
+            name='Load',
+            line=dict(width=2, color='black'),
+            fill=None
+        ))
+        fig_prod.update_layout(title='Actual Electricity Production in Luxembourg',
+                              xaxis_title='Date (GMT+2)',
+                              yaxis_title='Power (MW)',
+                              height=500,
+                              legend_title='Source',
+                              template='plotly_white')
+        st.plotly_chart(fig_prod, use_container_width=True)
+
+    # The file is only generated when the button is clicked, one monthly partition at a time (see export_lux.py)
+    with st.expander('Download the quarter-hourly data of the selected range'):
+        export_format = st.radio('Format', available_formats(), horizontal=True, key='production_export_format')
+        st.download_button(
+            'Download',
+            data=lambda: b''.join(export_production(store_root, range_start, range_end, prod_cols, export_format)),
+            file_name=file_name(f"entsoe-lu-{user_start:%Y%m%d}-{user_end:%Y%m%d}", export_format),
+            mime=mime_type(export_format),
+            on_click='ignore',
+        )
 
-pdf_path = r'data/ilr-elc-pub-Communautes-Energetiques.pdf'
-
-try:
-    import PyPDF2
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text() + "\n"
-except ImportError:
-    st.warning('PyPDF2 is not installed. Please install it to enable PDF parsing.')
-    text = ""
-except Exception as e:
-    st.warning(f'Could not read PDF: {e}')
-    text = ""
-
-# Try to find all dates in the format dd/mm/yyyy or dd.mm.yyyy or yyyy-mm-dd
-# Adjust regex as needed for your PDF's date format
-if text:
-    date_patterns = [
-        r'(\d{2}/\d{2}/\d{4})',
-        r'(\d{2}\.\d{2}\.\d{4})',
-        r'(\d{4}-\d{2}-\d{2})'
-    ]
-    dates = []
-    for pat in date_patterns:
-        dates += re.findall(pat, text)
-    # Normalize all dates to pandas datetime
-    parsed_dates = []
-    for d in dates:
-        for fmt in ('%d/%m/%Y', '%d.%m.%Y', '%Y-%m-%d'):
-            try:
-                parsed_dates.append(pd.to_datetime(d, format=fmt))
-                break
-            except Exception:
-                continue
-    if parsed_dates:
-        # Count number of new cooperatives per month
-        months = [dt.strftime('%Y-%m') for dt in parsed_dates]
-        month_counts = Counter(months)
-        month_series = pd.Series(month_counts).sort_index()
-        # Make cumulative
-        cumulative_series = month_series.cumsum()
-        # Ensure all months are present in the index
-        if not cumulative_series.empty:
-            all_months = pd.date_range(start=cumulative_series.index[0], end=cumulative_series.index[-1], freq='MS').strftime('%Y-%m')
-            cumulative_series = cumulative_series.reindex(all_months, method='ffill').fillna(0)
-        # Plot
-        st.markdown('---')
-        st.subheader('Number of Cooperatives')
-        fig_coop = px.bar(
-            x=cumulative_series.index,
-            y=cumulative_series.values,
-            labels={'x': 'Month', 'y': 'Cumulative Number of Energy Sharing Communities (CEL, CER or CEN)'},
-            title='Cumulative Number of CEL, CER or CEN'
+    neighbours_section(range_start, range_end)
+
+
+# --- Generation mix of the neighbouring zones and net imports (daily means, see zones_lux.py) ---
+def neighbours_section(range_start, range_end):
+    zone_artifacts = [name for name in manifest['artifacts'] if name.startswith('production_D_')]
+    if not zone_artifacts and not has_artifact(manifest, 'net_imports_D'):
+        return
+    st.markdown('---')
+    st.subheader('Luxembourg and its Neighbours')
+    with span('zone comparison', zones=len(zone_artifacts)):
+        mixes = {}
+        for zone, name in [('LU', 'production_D')] + [(n[len('production_D_'):], n) for n in zone_artifacts]:
+            daily_means = read_artifact(manifest, name, start=range_start, end=range_end)
+            mixes[zone] = daily_means.drop(columns='Load', errors='ignore').mean()
+        mix = pd.DataFrame(mixes).T.clip(lower=0).dropna(how='all')
+        mix = mix.loc[:, mix.sum() > 0]
+        share = mix.div(mix.sum(axis=1), axis=0) * 100
+        fig_mix = px.bar(
+            share,
+            labels={'index': 'Zone', 'value': 'Share of production (%)', 'variable': 'Source'},
+            title='Generation Mix over the Selected Range',
+            color_discrete_map=custom_colors,
         )
-        st.plotly_chart(fig_coop, use_container_width=True)
-    else:
-        st.info('No valid dates found in the PDF for cooperative creation.')
-else:
-    st.info('No text could be extracted from the PDF.')
-
-# --- Extract energy communities and postcodes from PDF and plot on map ---
-
-if text:
-    # Extract community names and siège social (address)
-    # Example regex: community name, siège social (address with L-xxxx), date
-    # Improved extraction: match community name, any text, L-xxxx, any text, date
-    # This will work even if there are line breaks or inconsistent separators
-    community_pattern = r'([A-Za-zÀ-ÿ0-9\- ]+)\s+([\s\S]*?L-\d{4}[\s\S]*?)(\d{2}/\d{2}/\d{4}|\d{2}\.\d{2}\.\d{4}|\d{4}-\d{2}-\d{2})'
-    communities = re.findall(community_pattern, text, re.DOTALL)
-
-    # Build dataframe
-    if communities:
-        df_communities = pd.DataFrame(communities, columns=['Community', 'Siège social', 'Date'])
-        # Extract postcode from Siège social robustly
-        df_communities['Postcode'] = df_communities['Siège social'].str.extract(r'(L-\d{4})', expand=False)
-        df_communities['Postcode'] = df_communities['Postcode'].str.extract(r'(\d{4})', expand=False)
-        df_communities['Date'] = pd.to_datetime(df_communities['Date'], errors='coerce')
-        # Geocode postcodes using addresses.csv
-        adresses_post_df = pd.read_csv(adresses_path, sep=';')
-        adresses_post_df['postcode'] = adresses_post_df['code_postal'].astype(str).str.extract(r'(\d{4})', expand=False)
-        adresses_post_df = adresses_post_df[['postcode', 'lat_wgs84', 'lon_wgs84']].drop_duplicates('postcode')
-        df_communities = pd.merge(df_communities, adresses_post_df, left_on='Postcode', right_on='postcode', how='left')
-        # Drop communities without coordinates
-        df_communities = df_communities.dropna(subset=['lat_wgs84', 'lon_wgs84'])
-        # Add extra info to hover: 'Nom de la Communauté énergétique', 'Date de la dernière notification', 'Raison sociale'
-        # If these columns exist in df_communities, add them to hover_data
-        hover_cols = ['Postcode', 'Date', 'Siège social']
-        for extra_col in ['Nom de la Communauté énergétique', 'Date de la dernière notification', 'Raison sociale']:
-            if extra_col in df_communities.columns:
-                hover_cols.append(extra_col)
-        fig_comm_map = px.scatter_mapbox(
-            df_communities,
-            lat='lat_wgs84',
-            lon='lon_wgs84',
-            hover_name='Community',
-            hover_data=hover_cols,
-            color_discrete_sequence=['red'],
-            zoom=8,
-            mapbox_style='open-street-map',
-            title='Energy Communities by Location (Postcode)'
+        fig_mix.update_layout(template='plotly_white', height=450, barmode='stack')
+        st.plotly_chart(fig_mix, use_container_width=True)
+
+        if has_artifact(manifest, 'net_imports_D'):
+            imports = read_artifact(manifest, 'net_imports_D', start=range_start, end=range_end)
+            fig_imports = px.line(
+                imports,
+                labels={'index': 'Date', 'value': 'Net import into Luxembourg (MW, daily mean)', 'variable': 'From'},
+                title='Net Physical Imports by Neighbour',
+            )
+            fig_imports.update_layout(template='plotly_white', height=400)
+            st.plotly_chart(fig_imports, use_container_width=True)
+
+
+# --- Renewable share, import dependency and capacity factors (precomputed daily, see analytics_lux.py) ---
+def analytics_section():
+    with span('load analytics') as s:
+        df_analytics = read_artifact(manifest, 'analytics') if has_artifact(manifest, 'analytics') else pd.DataFrame()
+        s['rows'] = len(df_analytics)
+
+    if df_analytics.empty:
+        st.info('No renewable share or capacity factors have been built yet (see analytics_lux.py).')
+        return
+    st.subheader('Renewable Share and Capacity Factors')
+    with span('analytics figures'):
+        fig_share = px.line(
+            df_analytics[['Renewable share (30-day)', 'Import dependency (30-day)']] * 100,
+            labels={'index': 'Date', 'value': 'Share of Load (%)', 'variable': 'Indicator'},
+            title='Renewable Share of Load and Import Dependency (30-day rolling)',
         )
-        fig_comm_map.update_layout(height=600)
-        st.markdown('---')
-        st.subheader('Energy Communities by Location (Postcode)')
-        st.plotly_chart(fig_comm_map, use_container_width=True)
-    else:
-        st.info('No energy communities with postcodes found in the PDF.')
+        fig_share.update_layout(template='plotly_white', height=400)
+        st.plotly_chart(fig_share, use_container_width=True)
+
+        capacity_factor_cols = [f'{col} capacity factor' for col in capacity_types]
+        # Only known from the first recorded ILR workbook version on (see capacity_history_lux.py)
+        known_cf = df_analytics[capacity_factor_cols].dropna(how='all')
+        if known_cf.empty:
+            st.info('Capacity factors start with the first recorded version of the ILR workbook.')
+            return
+        monthly_cf = known_cf.resample('MS').mean() * 100
+        st.caption(f"Capacity factors start on {known_cf.index[0]:%Y-%m-%d}, the first recorded version of the ILR "
+                   "workbook: the workbook has no commissioning dates, so earlier capacity is unknown.")
+        fig_cf = px.line(
+            monthly_cf,
+            labels={'index': 'Month', 'value': 'Capacity factor (%)', 'variable': 'Technology'},
+            title='Monthly Capacity Factors (ENTSO-E output / installed capacity in the ILR workbook)',
+            color_discrete_map={'Solar capacity factor': '#FFD700', 'Wind Onshore capacity factor': '#87CEEB'},
+        )
+        fig_cf.update_layout(template='plotly_white', height=400)
+        st.plotly_chart(fig_cf, use_container_width=True)
+
+
+# --- Plot number of added cooperatives per month from PDF ---
+import matplotlib.dates as mdates
 
-# --- Distribution of PV installation sizes (Bubble Plot, one bubble per installation, vertically jittered) ---
-st.markdown('---')
-st.subheader('Distribution of PV Installation Sizes (kW)')
-
-import numpy as np
-pv_sizes = df['Sum of Puissance installée (kW)'].dropna().astype(float)
-# Add vertical jitter to y for each bubble
-np.random.seed(42)  # For reproducibility
-pv_bubble_df = pd.DataFrame({'Installed Power (kW)': pv_sizes, 'y': np.random.uniform(-0.5, 0.5, size=len(pv_sizes))})
-
-fig_pv_bubble = px.scatter(
-    pv_bubble_df,
-    x='Installed Power (kW)',
-    y='y',
-    size=[8]*len(pv_bubble_df),  # All bubbles same size for visual clarity
-    color='Installed Power (kW)',
-    color_continuous_scale='Viridis',
-    labels={'Installed Power (kW)': 'Installed Power (kW)'},
-    title='Bubble Plot of PV Installation Sizes (One Bubble per Installation)',
-    size_max=12,
-    height=600
-)
-fig_pv_bubble.update_traces(marker=dict(line=dict(width=0.1)))  # Remove bubble contour
-fig_pv_bubble.update_layout(
-    xaxis_title='Installed Power (kW)',
-    yaxis_title='',
-    yaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-    height=600,
-    coloraxis_showscale=False
-)
-st.plotly_chart(fig_pv_bubble, use_container_width=True)
 
+def communities_section():
+    # Cumulative count per month, precomputed from the parsed PDF (see communities_pdf_lux.py)
+    with span('cooperatives chart'):
+        if has_artifact(manifest, 'cooperatives'):
+            cumulative_series = read_artifact(manifest, 'cooperatives').set_index('Month')['Cooperatives']
+            if not cumulative_series.empty:
+                # Plot
+                st.subheader('Number of Cooperatives')
+                fig_coop = px.bar(
+                    x=cumulative_series.index,
+                    y=cumulative_series.values,
+                    labels={'x': 'Month', 'y': 'Cumulative Number of Energy Sharing Communities (CEL, CER or CEN)'},
+                    title='Cumulative Number of CEL, CER or CEN'
+                )
+                st.plotly_chart(fig_coop, use_container_width=True)
+            else:
+                st.info('No valid dates found in the PDF for cooperative creation.')
+        else:
+            st.info('No energy communities could be extracted from the PDF.')
+
+    # --- Plot energy communities by postcode on a map ---
+    with span('communities map'):
+        if has_artifact(manifest, 'communities'):
+            # Communities with a postcode, geocoded with the postcode centroids from addresses.csv (see geocode_lux.py)
+            df_communities = read_artifact(manifest, 'communities')
+            # Drop communities without coordinates
+            df_communities = df_communities.dropna(subset=['Latitude', 'Longitude'])
+
+            if not df_communities.empty:
+                hover_cols = ['Postcode', 'Date', 'Siège social', 'Raison sociale']
+                fig_comm_map = px.scatter_mapbox(
+                    df_communities,
+                    lat='Latitude',
+                    lon='Longitude',
+                    hover_name='Community',
+                    hover_data=hover_cols,
+                    color_discrete_sequence=['red'],
+                    zoom=8,
+                    mapbox_style='open-street-map',
+                    title='Energy Communities by Location (Postcode)'
+                )
+                fig_comm_map.update_layout(height=600)
+                st.markdown('---')
+                st.subheader('Energy Communities by Location (Postcode)')
+                st.plotly_chart(fig_comm_map, use_container_width=True)
+            else:
+                st.info('No energy communities with postcodes found in the PDF.')
 
 
+# --- Distribution of PV installation sizes (Bubble Plot, one bubble per installation, vertically jittered) ---
+def pv_sizes_section():
+    st.subheader('Distribution of PV Installation Sizes (kW)')
+
+    # One marker per installation while that stays fast, WebGL or a log-binned histogram above (see pv_sizes_lux.py)
+    if not has_artifact(manifest, 'pv_points'):
+        st.info('The PV installation sizes have not been built (see build_artifacts_lux.py).')
+        return
+    with span('pv size distribution') as s:
+        pv_bubble_df = read_artifact(manifest, 'pv_points')
+        pv_mode = render_mode(len(pv_bubble_df))
+        s['rows'], s['mode'] = len(pv_bubble_df), pv_mode
+
+        if pv_mode == 'histogram':
+            pv_bins = read_artifact(manifest, 'pv_size_bins')
+            # Step outline over the bin edges, drawn on a logarithmic x axis
+            fig_pv_bubble = go.Figure(go.Scatter(
+                x=list(pv_bins['Lower (kW)']) + [pv_bins['Upper (kW)'].iloc[-1]],
+                y=list(pv_bins['Installations']) + [0],
+                mode='lines',
+                line=dict(shape='hv', color='#440154'),
+                fill='tozeroy',
+                customdata=list(pv_bins['Upper (kW)']) + [None],
+                hovertemplate='%{x:.3g} - %{customdata:.3g} kW: %{y} installations<extra></extra>',
+            ))
+            fig_pv_bubble.update_layout(
+                title=f'PV Installation Sizes ({len(pv_bubble_df)} installations, logarithmic bins)',
+                xaxis_title='Installed Power (kW)',
+                xaxis_type='log',
+                yaxis_title='Installations',
+                height=600,
+                template='plotly_white'
+            )
+        else:
+            fig_pv_bubble = px.scatter(
+                pv_bubble_df,
+                x='Installed Power (kW)',
+                y='y',
+                color='Installed Power (kW)',
+                color_continuous_scale='Viridis',
+                labels={'Installed Power (kW)': 'Installed Power (kW)'},
+                title='Bubble Plot of PV Installation Sizes (One Bubble per Installation)',
+                render_mode='webgl' if pv_mode == 'webgl' else 'svg',
+                height=600
+            )
+            # All bubbles same size for visual clarity, without contour
+            fig_pv_bubble.update_traces(marker=dict(size=12, line=dict(width=0.1)))
+            fig_pv_bubble.update_layout(
+                xaxis_title='Installed Power (kW)',
+                yaxis_title='',
+                yaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
+                height=600,
+                coloraxis_showscale=False
+            )
+        st.plotly_chart(fig_pv_bubble, use_container_width=True)
+
+
+# Only the selected section is computed (st.tabs would run every tab on each rerun), so the maps and the
+# PV plot are not built until they are opened. ?section=<name> in the URL opens a section directly.
+sections = {
+    'Production': production_section,
+    'Renewables': analytics_section,
+    'Installed capacity': installed_capacity_section,
+    'Energy communities': communities_section,
+    'PV sizes': pv_sizes_section,
+}
+if 'section' not in st.session_state and st.query_params.get('section') in sections:
+    st.session_state['section'] = st.query_params['section']
+st.markdown('---')
+section = st.radio('Section', list(sections), key='section', horizontal=True, label_visibility='collapsed')
+st.query_params['section'] = section
+sections[section]()
+
+# --- Per-stage timings of this run ---
+if is_enabled():
+    with st.expander('Performance (debug)'):
+        st.dataframe(pd.DataFrame(records()), use_container_width=True)
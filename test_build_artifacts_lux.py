@@ -0,0 +1,35 @@
+import json
+import os
+
+import pandas as pd
+
+from artifacts_lux import load_manifest, read_artifact
+from build_artifacts_lux import build_artifacts
+from capacity_history_lux import history_columns, history_path
+
+
+# Fresh checkout with only the recorded capacity history: the other inputs are missing and skipped
+def test_build_artifacts_with_capacity_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    history = pd.DataFrame([
+        ['2026-01-10', 'Luxembourg', 'Installation photovoltaïque', 1500.0, 10],
+        ['2026-01-10', 'Wiltz', 'Eolienne', 4000.0, 2],
+        ['2026-02-03', 'Luxembourg', 'Installation photovoltaïque', 250.0, 3],
+    ], columns=history_columns)
+    history.to_csv(history_path, index=False)
+
+    root = str(tmp_path / 'artifacts')
+    manifest = build_artifacts(root=root)
+    assert manifest is not None
+    with open(os.path.join(root, 'current.json'), encoding='utf-8') as f:
+        assert json.load(f)['version'] == manifest['version']
+
+    manifest = load_manifest(root=root)
+    assert sorted(manifest['artifacts']['capacity_timeline']['partitions']) == ['2026-01', '2026-02']
+    timeline = read_artifact(manifest, 'capacity_timeline', root)
+    assert timeline.index.tz is None
+    assert timeline.loc['2026-02-03', 'Installation photovoltaïque'] == 1.75
+    assert timeline.loc['2026-02-03', 'Eolienne'] == 4.0
+    january = read_artifact(manifest, 'capacity_timeline', root, start='2026-01-01', end='2026-01-31')
+    assert list(january.index) == [pd.Timestamp('2026-01-10')]
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from entsoe_backfill_lux import (NoMatchingDataError, backfill, checkpoint_name, month_chunks, read_checkpoint,
+                                 with_retry)
+from entsoe_store_lux import read_range
+
+tz = 'Europe/Brussels'
+
+
+def no_sleep(seconds):
+    pass
+
+
+# Stand-in for EntsoePandasClient: 15-min series for the requested window, failing on request
+class StubClient:
+    def __init__(self, fail_months=(), transient_failures=0, no_load_months=()):
+        self.fail_months = set(fail_months)
+        self.transient_failures = transient_failures
+        self.no_load_months = set(no_load_months)
+        self.generation_calls = []
+
+    def _index(self, start, end):
+        return pd.date_range(start, end, freq='15min', inclusive='left')
+
+    def query_generation(self, country_code, start, end, psr_type=None):
+        self.generation_calls.append(start.strftime('%Y-%m'))
+        if start.strftime('%Y-%m') in self.fail_months:
+            raise ConnectionError('service unavailable')
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise ConnectionError('connection reset')
+        index = self._index(start, end)
+        return pd.DataFrame({'Solar': np.ones(len(index)), 'Wind Onshore': np.full(len(index), 2.0)}, index=index)
+
+    def query_load(self, country_code, start, end):
+        if start.strftime('%Y-%m') in self.no_load_months:
+            raise NoMatchingDataError()
+        index = self._index(start, end)
+        return pd.Series(np.full(len(index), 5.0), index=index)
+
+
+def test_month_chunks_split_on_calendar_months():
+    chunks = month_chunks(pd.Timestamp('2024-01-15', tz=tz), pd.Timestamp('2024-03-10', tz=tz))
+    assert [(a.strftime('%Y-%m-%d'), b.strftime('%Y-%m-%d')) for a, b in chunks] == [
+        ('2024-01-15', '2024-02-01'), ('2024-02-01', '2024-03-01'), ('2024-03-01', '2024-03-10')]
+
+
+def test_with_retry_retries_transient_failures():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError('connection reset')
+        return 'ok'
+
+    assert with_retry(flaky, retries=3, sleep=no_sleep, limiter=None) == 'ok'
+    assert len(calls) == 3
+
+
+def test_with_retry_treats_no_matching_data_as_empty():
+    def no_data():
+        raise NoMatchingDataError()
+
+    assert with_retry(no_data, sleep=no_sleep, limiter=None) is None
+
+
+def test_backfill_retries_and_keeps_months_without_load(tmp_path):
+    root = str(tmp_path / 'LU')
+    client = StubClient(transient_failures=1, no_load_months={'2024-02'})
+    backfill(client, 'LU', ['Solar', 'Wind Onshore'], root=root, start=pd.Timestamp('2024-01-01', tz=tz),
+             end=pd.Timestamp('2024-03-01', tz=tz), sleep=no_sleep)
+
+    stored = read_range(root)
+    assert len(stored) == len(pd.date_range('2024-01-01', '2024-03-01', freq='15min', tz=tz, inclusive='left'))
+    assert stored.loc['2024-01', 'Load'].eq(5).all()
+    assert stored.loc['2024-02', 'Load'].isna().all()
+    assert stored['Solar'].eq(1).all()
+    assert not os.path.exists(os.path.join(root, checkpoint_name))
+
+
+def test_backfill_resumes_after_a_failed_month(tmp_path):
+    root = str(tmp_path / 'LU')
+    start, end = pd.Timestamp('2024-01-01', tz=tz), pd.Timestamp('2024-04-01', tz=tz)
+    with pytest.raises(RuntimeError, match='2024-02-01'):
+        backfill(StubClient(fail_months={'2024-02'}), 'LU', ['Solar'], root=root, start=start, end=end,
+                 retries=1, sleep=no_sleep)
+    assert sorted(read_checkpoint(root)['completed']) == ['2024-01-01', '2024-03-01']
+
+    # The second run only fetches the missing month, over the range recorded in backfill.json
+    client = StubClient()
+    backfill(client, 'LU', ['Solar'], root=root, start=pd.Timestamp('2020-01-01', tz=tz), sleep=no_sleep)
+    assert client.generation_calls == ['2024-02']
+    assert read_checkpoint(root) is None
+    assert len(read_range(root)) == len(pd.date_range(start, end, freq='15min', inclusive='left'))
@@ -0,0 +1,178 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from entsoe_backfill_lux import month_chunks
+from entsoe_store_lux import display_tz, has_data, read_range, write
+from query_lux import read_history
+
+# Data-quality checks for a store: missing quarter-hours, duplicate timestamps, NaN runs in columns
+# that are normally filled, all-NaN columns and outliers. The result is kept in <root>/gaps.json and
+# the intervals listed there are fetched again on the next update (at most max_attempts times each).
+gaps_name = 'gaps.json'
+max_attempts = 3
+# Columns missing in more than this fraction of rows are reported, but their NaN runs are not gaps
+sparse_fraction = 0.5
+# Gaps closer than this are merged into one interval to keep the index (and the refetches) small
+merge_within = pd.Timedelta(hours=6)
+outlier_mads = 10
+
+
+def gaps_path(root):
+    return os.path.join(root, gaps_name)
+
+
+def read_gaps(root):
+    path = gaps_path(root)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_gaps(root, index):
+    path = gaps_path(root)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _iso(ns):
+    return pd.Timestamp(int(ns), tz='UTC').isoformat()
+
+
+# Expected spacing around every interval: the smaller of the two neighbouring intervals, so a change
+# of resolution (hourly -> quarter-hourly) does not turn every timestamp into a gap
+def _local_step(diffs):
+    prev = np.concatenate([diffs[:1], diffs[:-1]])
+    nxt = np.concatenate([diffs[1:], diffs[-1:]])
+    return np.minimum(prev, nxt)
+
+
+# [start, end) intervals (int64 ns) of missing rows, and of NaN runs per column
+def _missing_intervals(values, ts):
+    intervals = []
+    diffs = np.diff(ts)
+    if len(diffs) > 1:
+        step = _local_step(diffs)
+        for i in np.flatnonzero(diffs > step):
+            intervals.append((ts[i] + step[i], ts[i + 1], None))
+    last_step = diffs[-1] if len(diffs) else 0
+    ends = np.append(ts[1:], ts[-1] + last_step)
+    for col in values.columns:
+        missing = values[col].isna().to_numpy()
+        padded = np.concatenate([[False], missing, [False]]).astype(np.int8)
+        edges = np.diff(padded)
+        for a, b in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1):
+            intervals.append((ts[a], ends[b], col))
+    return intervals
+
+
+def _merge(intervals):
+    merged = []
+    for start, end, col in sorted(intervals, key=lambda i: i[0]):
+        if merged and start <= merged[-1]['end'] + merge_within.value:
+            merged[-1]['end'] = max(merged[-1]['end'], end)
+            merged[-1]['columns'].add(col)
+        else:
+            merged.append({'start': start, 'end': end, 'columns': {col}})
+    return merged
+
+
+# Vectorised scan of a store; previous: the last index, whose attempt counts are carried over
+def validate(root, previous=None):
+    if not has_data(root):
+        return None
+    history = read_history(root)
+    ts = history.index.tz_convert('UTC').tz_localize(None).to_numpy().astype('datetime64[ns]').view('int64')
+    values = history.astype('float64')
+
+    missing_share = values.isna().mean()
+    empty_columns = [col for col in values.columns if missing_share[col] == 1]
+    sparse_columns = [col for col in values.columns if sparse_fraction < missing_share[col] < 1]
+    checked = values.drop(columns=empty_columns + sparse_columns)
+
+    # Non-negative series: negative values and points far outside the robust spread are reported
+    median = checked.median()
+    mad = (checked - median).abs().median()
+    outliers = (checked < 0) | ((checked - median).abs() > outlier_mads * mad.where(mad > 0))
+    outlier_counts = {col: int(n) for col, n in outliers.sum().items() if n}
+
+    attempted = [(pd.Timestamp(g['start']).value, pd.Timestamp(g['end']).value, g['attempts'])
+                 for g in (previous or {}).get('gaps', []) if g.get('attempts')]
+    gaps = []
+    for gap in _merge(_missing_intervals(checked, ts)):
+        # A gap keeps the attempt count of the earlier gaps it overlaps
+        attempts = max([n for a, b, n in attempted if a < gap['end'] and gap['start'] < b] or [0])
+        columns = sorted(c for c in gap['columns'] if c is not None)
+        gaps.append({
+            'start': _iso(gap['start']),
+            'end': _iso(gap['end']),
+            'rows_missing': None in gap['columns'],
+            'columns': columns,
+            'attempts': attempts,
+        })
+
+    index = {
+        'checked': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'rows': int(len(history)),
+        'duplicates': int((np.diff(ts) == 0).sum()),
+        'empty_columns': empty_columns,
+        'sparse_columns': sparse_columns,
+        'outliers': outlier_counts,
+        'gaps': gaps,
+    }
+    _write_gaps(root, index)
+    return index
+
+
+def pending_gaps(root):
+    index = read_gaps(root) or {'gaps': []}
+    return [g for g in index['gaps'] if g['attempts'] < max_attempts]
+
+
+# Fetch the pending gaps again with fetch(start, end) and merge the result into the store.
+# Values that are still missing in the new data keep what was stored before.
+def repair_gaps(root, fetch):
+    index = read_gaps(root)
+    if index is None:
+        return 0
+    repaired = 0
+    for gap in index['gaps']:
+        if gap['attempts'] >= max_attempts:
+            continue
+        gap['attempts'] += 1
+        start = pd.Timestamp(gap['start']).tz_convert(display_tz)
+        end = pd.Timestamp(gap['end']).tz_convert(display_tz)
+        for chunk_start, chunk_end in month_chunks(start, end):
+            result = fetch(chunk_start, chunk_end)
+            if result is None or result.empty:
+                continue
+            existing = read_range(root, result.index.min(), result.index.max())
+            write(result.combine_first(existing), root)
+            repaired += len(result)
+    _write_gaps(root, index)
+    return repaired
+
+
+def refresh(root, fetch=None):
+    if fetch is not None:
+        repair_gaps(root, fetch)
+    return validate(root, read_gaps(root))
+
+
+if __name__ == '__main__':
+    import sys
+    from entsoe_store_lux import store_path
+
+    for zone in sys.argv[1:] or ['LU']:
+        report = validate(store_path(zone), read_gaps(store_path(zone)))
+        if report is None:
+            print(f"{zone}: no data")
+            continue
+        print(f"{zone}: {report['rows']} rows, {len(report['gaps'])} gap(s), {report['duplicates']} duplicate(s), "
+              f"empty columns: {', '.join(report['empty_columns']) or '-'}, outliers: {report['outliers'] or '-'}")
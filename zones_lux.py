@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from entsoe_backfill_lux import (backfill, backfill_pending, fetch_window, production_types,
+                                 with_retry)
+from entsoe_store_lux import ensure_store, has_data, last_timestamp, store_path, write
+from instrument_lux import span
+from query_lux import refresh_rollup
+from validate_lux import refresh as validate_store
+
+# Bidding zones / countries kept in the store, each under data/entsoe/<zone>.
+# Luxembourg keeps the production types shown on the dashboard, the neighbours every type they report.
+# Set STROUMAUER_ZONES (e.g. "LU,DE") to fetch a different set.
+main_zone = 'LU'
+zone_types = {
+    'LU': production_types,
+    'DE': None,
+    'BE': None,
+    'FR': None,
+}
+neighbours = {'LU': ['DE', 'BE', 'FR']}
+flows_start = pd.Timestamp('2024-01-01T00:00', tz='Europe/Brussels')
+# Overlap with the stored data on every update, so ENTSO-E revisions of recent values are picked up.
+# Holes older than that are refetched from the gap index (see validate_lux.py).
+update_lookback = pd.Timedelta(days=5)
+
+# Legacy single-file export, only read once to seed the Luxembourg store
+csv_path = r'data/entsoe_lux.csv'
+
+
+def configured_zones():
+    names = os.environ.get('STROUMAUER_ZONES')
+    if not names:
+        return dict(zone_types)
+    return {zone: zone_types.get(zone) for zone in (n.strip() for n in names.split(',')) if zone}
+
+
+def flows_path(zone=main_zone):
+    return store_path(f'{zone}_flows')
+
+
+def flow_column(country_from, country_to):
+    return f'{country_from} > {country_to}'
+
+
+# Physical flows between zone and each neighbour in both directions for one window, one column per direction
+def fetch_flows(client, zone, zone_neighbours, start, end, executor, **retry_kwargs):
+    futures = {}
+    for other in zone_neighbours:
+        for a, b in [(other, zone), (zone, other)]:
+            futures[flow_column(a, b)] = executor.submit(
+                with_retry, lambda a=a, b=b: client.query_crossborder_flows(a, b, start=start, end=end), **retry_kwargs)
+    flows = {name: future.result() for name, future in futures.items()}
+    flows = {name: series for name, series in flows.items() if series is not None}
+    return pd.DataFrame(flows)
+
+
+# Net import of zone from each neighbour (MW, negative for exports)
+def net_imports(flows, zone=main_zone):
+    result = {}
+    for other in neighbours.get(zone, []):
+        into, out = flow_column(other, zone), flow_column(zone, other)
+        if into in flows or out in flows:
+            result[other] = flows.get(into, 0) - flows.get(out, 0)
+    return pd.DataFrame(result, index=flows.index)
+
+
+def _update_window(root):
+    start = last_timestamp(root).tz_convert('Europe/Brussels') - update_lookback
+    return start, pd.Timestamp(datetime.utcnow(), tz='Europe/Brussels')
+
+
+# Bring one zone up to date: backfill an empty (or interrupted) store, then refetch the last days
+def update_zone(client, zone, types, executor):
+    root = store_path(zone)
+    seeded = ensure_store(root, csv_path if zone == main_zone else None)
+    if backfill_pending(root) or not seeded:
+        with span('backfill', zone=zone):
+            backfill(client, zone, types, root=root, executor=executor)
+    start, end = _update_window(root)
+    with span('fetch update window', zone=zone) as s:
+        result = fetch_window(client, zone, start, end, types, executor)
+        s['rows'] = len(result)
+    # Each zone has its own store directory, so zones can be written from their own threads
+    with span('store write', zone=zone) as s:
+        touched = write(result, root)
+        s['partitions'] = len(touched)
+    # Refetch the intervals reported missing by the last validation, then validate again
+    with span('repair and validate', zone=zone) as s:
+        report = validate_store(root, lambda a, b: fetch_window(client, zone, a, b, types, executor))
+        s['gaps'] = len(report['gaps'])
+    with span('refresh daily rollup', zone=zone):
+        refresh_rollup(root)
+    return touched
+
+
+# Same as update_zone for the cross-border flows of zone, with the same resumable backfill
+def update_flows(client, zone, executor):
+    root = flows_path(zone)
+
+    def fetch(start, end, pool, **retry_kwargs):
+        return fetch_flows(client, zone, neighbours.get(zone, []), start, end, pool, **retry_kwargs)
+
+    if backfill_pending(root) or not has_data(root):
+        with span('backfill cross-border flows', zone=zone):
+            backfill(client, f'{zone} flows', None, root=root, start=flows_start, executor=executor, fetch=fetch)
+    if not has_data(root):
+        return []
+    start, end = _update_window(root)
+    with span('fetch cross-border flows', zone=zone) as s:
+        flows = fetch(start, end, executor)
+        s['rows'] = len(flows)
+    touched = write(flows, root)
+    validate_store(root, lambda a, b: fetch(a, b, executor))
+    refresh_rollup(root)
+    return touched
+
+
+# Update every configured zone and the cross-border flows of the main zone concurrently.
+# All ENTSO-E requests go through one bounded pool and the shared rate limiter.
+def update_all(client, zones=None, max_workers=8):
+    zones = configured_zones() if zones is None else zones
+    results, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as requests_pool, \
+            ThreadPoolExecutor(max_workers=len(zones) + 1) as zone_pool:
+        futures = {zone_pool.submit(update_zone, client, zone, types, requests_pool): zone for zone, types in zones.items()}
+        if main_zone in zones and neighbours.get(main_zone):
+            futures[zone_pool.submit(update_flows, client, main_zone, requests_pool)] = f'{main_zone} flows'
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failed[name] = e
+    return results, failed